@@ -0,0 +1,155 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, List
+import json
+import os
+import platform
+import sys
+
+import numpy as np
+
+import correlations_search_engine
+import double_regression
+import historical_tax_effort
+import synthetic_data
+from country_registry import load_registry
+from panel import Panel
+from sources import read_owid, read_worksheet_columns
+
+# Run a function 'repeats' times, returning how long (in seconds) every run took.
+def measure(function: Callable[[], object], repeats: int) -> List[float]:
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+
+    return times
+
+#  Time every stage of the analysis over the synthetic datasets in 'paths' (as returned
+# by 'synthetic_data.generate'). Returns stage name -> list of times.
+def run_stages(paths: Dict[str, str], repeats: int = 3, exponents: int = 10_000,
+               examples: int = 50) -> Dict[str, List[float]]:
+    registry = load_registry(paths['registry'])
+
+    def owid_columns() -> Dict:
+        return {
+            indicator: read_owid(paths[indicator], column, 100 if indicator == 'tax_burden' else 1, registry)
+            for indicator, column in synthetic_data.OWID_COLUMNS.items()
+        }
+
+    def workbook_columns() -> Dict:
+        return {
+            'unemployment': read_worksheet_columns(paths['unemployment'], 5, 100, registry),
+            'gdp_ppp': read_worksheet_columns(paths['gdp_ppp'], 2, 1, registry),
+        }
+
+    timings = {
+        'ingestion_owid': measure(lambda: Panel.from_columns(owid_columns(), registry), repeats),
+        'ingestion_xlsx': measure(lambda: Panel.from_columns(workbook_columns(), registry), repeats),
+    }
+
+    panel = Panel.from_columns({**owid_columns(), **workbook_columns()}, registry)
+    last_year = int(panel.years[-1])
+
+    timings['tax_effort'] = measure(lambda: historical_tax_effort.tax_effort_matrix(panel, panel.first_year, last_year), repeats)
+
+    data = correlations_search_engine.load_data(paths['data'])
+    exponent_grid = np.linspace(1, 50, exponents)
+    timings['correlation_sweep'] = measure(lambda: correlations_search_engine.sweep_array(exponent_grid, data), repeats)
+
+    # 'core' for the first countries with data, using the three first ones as exemplary countries.
+    double_regression.load_data(panel)
+    countries = list(double_regression.data)
+    exemplary_countries = tuple(countries[:3])
+    example_countries = countries[3:3 + examples]
+
+    def run_core() -> Dict[str, Dict | None]:
+        results = {}
+        for example_country in example_countries:
+            try:
+                results[example_country] = double_regression.core(example_country, exemplary_countries)
+            except ZeroDivisionError:
+                results[example_country] = None
+
+        return results
+
+    timings['core'] = measure(run_core, repeats)
+
+    results = run_core()
+    with TemporaryDirectory() as directory:
+        timings['xlsx_export'] = measure(
+            lambda: double_regression.write_results(results, os.path.join(directory, 'results.xlsx'), exemplary_countries),
+            repeats
+        )
+
+    return timings
+
+#  Compare a report with a previous one. Stages whose fastest run got more than 'tolerance'
+# (as a fraction) slower are returned as stage -> (previous time, current time). The 
+# fastest run is used because it is the least affected by noise from other processes.
+def find_regressions(report: Dict, previous: Dict, tolerance: float = 0.2) -> Dict[str, tuple]:
+    regressions = {}
+    for stage, result in report['stages'].items():
+        if stage not in previous['stages']:
+            continue
+
+        before = previous['stages'][stage]['min']
+        if result['min'] > before * (1 + tolerance):
+            regressions[stage] = (before, result['min'])
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark every stage of the analysis over synthetic datasets.')
+    parser.add_argument('--countries', type=int, default=200)
+    parser.add_argument('--years', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--exponents', type=int, default=10_000, help='exponents of the correlation sweep')
+    parser.add_argument('--examples', type=int, default=50, help="example countries given to 'core'")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--directory', help='where synthetic datasets are kept (temporary by default)')
+    parser.add_argument('--output', help='JSON file to save the report to')
+    parser.add_argument('--compare', help='previous JSON report to look for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown allowed before flagging a regression')
+    arguments = parser.parse_args()
+
+    with TemporaryDirectory() as temporary_directory:
+        start = perf_counter()
+        paths = synthetic_data.generate(arguments.directory or temporary_directory, arguments.countries,
+                                        arguments.years, seed=arguments.seed)
+        generation_time = perf_counter() - start
+
+        timings = run_stages(paths, arguments.repeats, arguments.exponents, arguments.examples)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'scale': {'countries': arguments.countries, 'years': arguments.years, 'exponents': arguments.exponents,
+                  'examples': arguments.examples, 'seed': arguments.seed},
+        'generation': generation_time,
+        'stages': {stage: {'min': min(times), 'median': median(times), 'times': times} for stage, times in timings.items()},
+    }
+
+    for stage, result in report['stages'].items():
+        print(f'{stage:<20} {result["median"] * 1000:>12,.2f} ms (min {result["min"] * 1000:,.2f} ms)')
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare, 'r') as file:
+            regressions = find_regressions(report, json.load(file), arguments.tolerance)
+
+        for stage, (before, after) in regressions.items():
+            print(f'REGRESSION: {stage} went from {before * 1000:,.2f} ms to {after * 1000:,.2f} ms')
+
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,171 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import Dict, Tuple
+
+import numpy as np
+
+from correlations_search_engine import METHODS, load_data, optimize
+from effort import PHI
+from rank_correlation import paired_correlations
+
+#  Bootstrap of the exponent search in 'correlations_search_engine': countries in
+# 'data.csv' are resampled (with replacement) thousands of times and the optimal
+# exponent is searched again for every resample, giving confidence intervals for
+# the exponent and its correlations.
+
+# Resamples handled by every task. It is fixed so results only depend on the seed.
+CHUNK_SIZE = 256
+
+# Data shared by every worker, sent once when the pool starts.
+_data: Dict[str, np.ndarray] = None
+
+def _initialize(data: Dict[str, np.ndarray]) -> None:
+    global _data
+
+    _data = data
+
+#  Correlations (with the given methods) of the tax effort against the Human Development
+# Index of every resample (row of 'indices') with its own exponent.
+def _correlations(exponents: np.ndarray, indices: np.ndarray, methods: Tuple[str]) -> np.ndarray:
+    base = np.log(_data['tax_burden']) - np.log1p(-_data['tax_burden']) - np.log1p(-_data['unemployment'])
+    log_efforts = base[indices] - exponents[:, np.newaxis] * np.log(_data['gdp_ppp'])[indices]
+    hdi = _data['hdi'][indices]
+
+    columns = {}
+    if 'pearson' in methods:
+        # Pearson is scale invariant, so every row is rescaled to avoid overflows.
+        efforts = np.exp(log_efforts - log_efforts.max(axis=1, keepdims=True))
+        columns['pearson'] = paired_correlations(efforts, hdi, ('pearson',))[:, 0]
+
+    rank_methods = tuple(method for method in methods if method != 'pearson')
+    if rank_methods:
+        columns.update(zip(rank_methods, paired_correlations(log_efforts, hdi, rank_methods).T))
+
+    return np.column_stack([columns[method] for method in methods])
+
+#  Optimal exponent of every resample: the same search as 'correlations_search_engine.optimize'
+# (a coarse grid and a golden-section search), run in lockstep for every resample. All the
+# brackets shrink at the same pace, so every iteration evaluates one exponent per resample.
+def _search(indices: np.ndarray, method: str, goal: str, low: float, high: float,
+            tolerance: float, grid_size: int) -> np.ndarray:
+    sign = 1 if goal == 'min' else -1
+    resamples = len(indices)
+
+    def objective(exponents: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        values = sign * _correlations(exponents, rows, (method,))[:, 0]
+
+        return np.where(np.isnan(values), np.inf, values)
+
+    grid = np.linspace(low, high, grid_size)
+    values = objective(np.tile(grid, resamples), np.repeat(indices, grid_size, axis=0)).reshape(resamples, grid_size)
+
+    best = np.argmin(values, axis=1)
+    best_exponents, best_values = grid[best], values[np.arange(resamples), best]
+
+    a, b = grid[np.maximum(best - 1, 0)], grid[np.minimum(best + 1, grid_size - 1)]
+    c, d = b - (b - a) / PHI, a + (b - a) / PHI
+    fc, fd = objective(c, indices), objective(d, indices)
+
+    while (b - a).max() > tolerance:
+        # Where the minimum lies on the left, the interval becomes [a, d]; otherwise, [c, b].
+        left = fc < fd
+        a, b = np.where(left, a, c), np.where(left, d, b)
+
+        #  One inner point is kept (c becomes the new d on the left; d becomes the new c on the
+        # right) and the other one is evaluated.
+        kept, kept_values = np.where(left, c, d), np.where(left, fc, fd)
+        new = np.where(left, b - (b - a) / PHI, a + (b - a) / PHI)
+        new_values = objective(new, indices)
+
+        c, fc = np.where(left, new, kept), np.where(left, new_values, kept_values)
+        d, fd = np.where(left, kept, new), np.where(left, kept_values, new_values)
+
+    for exponents, values in ((c, fc), (d, fd)):
+        better = values < best_values
+        best_exponents = np.where(better, exponents, best_exponents)
+        best_values = np.where(better, values, best_values)
+
+    return best_exponents
+
+#  Resample countries 'resamples' times with the given random seed (a SeedSequence, so
+# every chunk has an independent stream) and return, for every resample, the optimal
+# exponent followed by its Pearson, Spearman and Kendall correlations.
+def _run_chunk(task: Tuple[np.random.SeedSequence, int, str, str, float, float, float, int]) -> np.ndarray:
+    seed, resamples, method, goal, low, high, tolerance, grid_size = task
+
+    rng = np.random.default_rng(seed)
+    countries = len(_data['hdi'])
+    indices = rng.integers(0, countries, (resamples, countries))
+
+    exponents = _search(indices, method, goal, low, high, tolerance, grid_size)
+
+    return np.column_stack((exponents, _correlations(exponents, indices, METHODS)))
+
+#  Bootstrap the optimal exponent of a correlation method (by default, the minimum of
+# Pearson's, which is how the golden number was chosen). Resamples are generated in
+# chunks of 'CHUNK_SIZE', every one of them with its own random stream derived from
+# 'seed', and spread across a pool of processes; results are the same whatever the
+# number of processes. Returns, for the exponent and every correlation, the full-sample
+# estimate, the bootstrap mean and standard deviation and the 'confidence' interval
+# (percentile method).
+def bootstrap(replicates: int = 10_000, method: str = 'pearson', goal: str = 'min', low: float = 1,
+              high: float = 50.05, tolerance: float = 1e-6, grid_size: int = 30, confidence: float = 0.95,
+              seed: int = 0, processes: int = None, data: Dict[str, np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+    #  Arguments are checked as 'optimize' does, before any resample is searched (invalid
+    # goals would otherwise be taken as 'max' by the workers).
+    if method not in METHODS:
+        raise ValueError(f'Invalid method: it must be one of {", ".join(METHODS)}.')
+
+    if goal not in {'min', 'max'}:
+        raise ValueError("Invalid goal: it must be either 'min' or 'max'.")
+
+    if grid_size < 3 or not low < high:
+        raise ValueError('Invalid range: it needs at least 3 grid points and low must be lower than high.')
+
+    if replicates < 1 or not 0 < confidence < 1:
+        raise ValueError('Invalid bootstrap: it needs at least 1 replicate and a confidence between 0 and 1.')
+
+    data = load_data() if data is None else data
+
+    chunks = [min(CHUNK_SIZE, replicates - start) for start in range(0, replicates, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(chunk_seed, size, method, goal, low, high, tolerance, grid_size) for chunk_seed, size in zip(seeds, chunks)]
+
+    with Pool(processes, initializer=_initialize, initargs=(data,)) as pool:
+        results = np.concatenate(pool.map(_run_chunk, tasks))
+
+    # Estimates with every country (no resampling).
+    _initialize(data)
+    optimum = optimize(method, goal, low, high, tolerance, grid_size, data)['exponent']
+    estimates = [optimum, *_correlations(np.array([optimum]), np.arange(len(data['hdi']))[np.newaxis, :], METHODS)[0]]
+
+    tail = (1 - confidence) / 2
+    return {
+        name: {
+            'estimate': float(estimate),
+            'mean': float(np.nanmean(column)),
+            'std': float(np.nanstd(column)),
+            'low': float(np.nanquantile(column, tail)),
+            'high': float(np.nanquantile(column, 1 - tail)),
+        }
+        for name, estimate, column in zip(('exponent', *METHODS), estimates, results.T)
+    }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Bootstrap the exponent of an extreme correlation of tax efforts and HDIs.')
+    parser.add_argument('--replicates', type=int, default=10_000, help='number of resamples of the countries')
+    parser.add_argument('--method', choices=METHODS, default='pearson')
+    parser.add_argument('--goal', choices=('min', 'max'), default='min', help='whether to search the minimum or the maximum')
+    parser.add_argument('--confidence', type=float, default=0.95, help='level of the intervals (from 0 to 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int)
+    arguments = parser.parse_args()
+
+    results = bootstrap(arguments.replicates, arguments.method, arguments.goal, confidence=arguments.confidence,
+                        seed=arguments.seed, processes=arguments.processes)
+
+    for name, result in results.items():
+        print(f'{name.capitalize():<9} {result["estimate"]:>10.4f}   {arguments.confidence:.0%} CI',
+              f'[{result["low"]:.4f}, {result["high"]:.4f}] (mean {result["mean"]:.4f}, std {result["std"]:.4f})')
@@ -0,0 +1,66 @@
+from __future__ import annotations
+from argparse import REMAINDER, ArgumentParser, RawDescriptionHelpFormatter
+from typing import List
+import runpy
+import sys
+
+from effort import PHI, tax_effort
+
+#  Subcommands of the command-line interface: the module each one runs, as if it were run
+# as a script with the rest of the arguments, and what it does. Modules are imported only
+# once their subcommand is chosen, so every subcommand loads just the dependencies it needs
+# (pandas, matplotlib and openpyxl are never loaded by 'effort' or 'scenarios').
+COMMANDS = {
+    'sweep': ('correlations_search_engine', 'correlations of tax efforts and HDIs over a sweep of exponents (--optimize)'),
+    'bootstrap': ('bootstrap_exponent', 'confidence intervals of the exponents of the correlation extremes'),
+    'historical': ('historical_tax_effort', 'charts of the tax efforts of every year (--render DIRECTORY)'),
+    'regression': ('double_regression', 'real GDP per capita estimations of the example countries'),
+    'parallel': ('parallel_regression', "'regression' for every country on a pool of processes"),
+    'pairs': ('pair_matrices', 'lambdas, intervals and weights of every pair of countries'),
+    'refresh': ('incremental', 'update the kept results with the changes of the sources'),
+    'scenarios': ('scenario_testing', 'tax efforts of scenarios of points and grids'),
+    'growth': ('poor_rich_countries_real_gdp_evolution', 'real GDP growth of low- and high-effort countries'),
+    'behaviour': ('effort_behaviour', 'chart of the tax efforts of a country with other tax burdens'),
+    'registry': ('country_registry', "rebuild the registry of countries ('datasets/countries.csv')"),
+    'benchmark': ('benchmark', 'time every stage of the analysis over synthetic datasets'),
+}
+
+# Print the tax effort of a single point.
+def effort(arguments: List[str]) -> None:
+    parser = ArgumentParser(prog='cli.py effort', description='Compute the tax effort of a single point.')
+    parser.add_argument('tax_burden', type=float, help='as a number from 0 (included) to 1 (excluded)')
+    parser.add_argument('unemployment', type=float, help='as a number from 0 (included) to 1 (excluded)')
+    parser.add_argument('gdp_ppp', type=float, help='GDP PPP per capita')
+    parser.add_argument('--exponent', type=float, default=PHI, help='exponent of GDP PPP (the golden number by default)')
+    arguments = parser.parse_args(arguments)
+
+    for parameter, parameter_title in (('tax_burden', 'tax burden'), ('unemployment', 'unemployment')):
+        if not 0 <= getattr(arguments, parameter) < 1:
+            parser.error(f'invalid {parameter_title}: it must be a (positive) percentage represented as a number '
+                         'from 0 (included) to 1 (excluded)')
+
+    print(tax_effort(arguments.tax_burden, arguments.unemployment, arguments.gdp_ppp, arguments.exponent))
+
+def main(argv: List[str] = None) -> None:
+    parser = ArgumentParser(
+        description='Measuring tax effort: every analysis of the repository from a single command.',
+        formatter_class=RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f'  {name:<12}{description}' for name, description in
+                                         [('effort', 'tax effort of a single point'),
+                                          *((name, description) for name, (_, description) in COMMANDS.items())]),
+    )
+    parser.add_argument('command', choices=['effort', *COMMANDS], metavar='command', help='see the list below')
+    parser.add_argument('arguments', nargs=REMAINDER, help="arguments of the command (see 'cli.py <command> -h')")
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == 'effort':
+        effort(arguments.arguments)
+        return
+
+    # The command's module runs as a script: its own parser reads the rest of the arguments.
+    sys.argv = [sys.argv[0], *arguments.arguments]
+    runpy.run_module(COMMANDS[arguments.command][0], run_name='__main__', alter_sys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,103 +1,213 @@
 # Import libraries we will use.
-from math import sqrt, pi, e
+from __future__ import annotations
+from argparse import ArgumentParser
+from math import pi, e
 from decimal import Decimal
-from typing import Tuple
+from csv import DictReader
+from typing import Dict, Iterable, List, Tuple
+import sys
+
+import numpy as np
 
-import pandas as pd
+from effort import PHI, log_tax_effort
+from rank_correlation import TargetCorrelation
+
+# Preprocessed data with columns: country, gdp_per_capita_ppp, tax_burden, hdi, unemployment
+DATA_PATH = 'datasets/data.csv'
+
+#  Number of exponents evaluated at the same time, so sweeps over millions of exponents
+# are computed in chunks of bounded memory.
+SWEEP_CHUNK_SIZE = 2 ** 15
+
+# Load the countries' data once, as arrays of percentages (0 to 1), GDPs and HDIs.
+def load_data(path: str = DATA_PATH) -> Dict[str, np.ndarray]:
+    with open(path, 'r') as file:
+        rows = list(DictReader(file))
+
+    return {
+        'country': np.array([row['country'] for row in rows]),
+        'tax_burden': np.array([float(row['tax_burden']) for row in rows]) / 100,
+        'unemployment': np.array([float(row['unemployment']) for row in rows]) / 100,
+        'gdp_ppp': np.array([float(row['gdp_per_capita_ppp']) for row in rows]),
+        'hdi': np.array([float(row['hdi']) for row in rows]),
+    }
 
-#  The golden number is not included in the math library, so 
-# we calculate and hold it in a variable.
-PHI = (1 + sqrt(5)) / 2
+#  Calculate Pearson, Spearman and Kendall correlations between the tax effort and
+# the Human Development Index for every exponent at once. Rows of the returned
+# array follow the order of the exponents given.
+def sweep_array(exponents: Iterable[float], data: Dict[str, np.ndarray] = None) -> np.ndarray:
+    data = load_data() if data is None else data
+    exponents = np.fromiter((float(exponent) for exponent in exponents), dtype=float)
+
+    # Ranks and ties of the Human Development Index are computed just once.
+    hdi = TargetCorrelation(data['hdi'])
+
+    table = np.empty((len(exponents), 3))
+    for index in range(0, len(exponents), SWEEP_CHUNK_SIZE):
+        chunk = exponents[index:index + SWEEP_CHUNK_SIZE]
+
+        # Exponents x countries matrix with the logarithm of every tax effort.
+        log_efforts = log_tax_effort(data['tax_burden'], data['unemployment'], data['gdp_ppp'], chunk)
+
+        #  Pearson is scale invariant, so every row is divided by its maximum before leaving
+        # logarithmic space; this keeps huge exponents from overflowing.
+        efforts = np.exp(log_efforts - log_efforts.max(axis=1, keepdims=True))
+
+        # Ranks are invariant to the (monotonic) logarithm, so they are taken from it directly.
+        table[index:index + SWEEP_CHUNK_SIZE] = np.column_stack((
+            hdi.pearson(efforts), hdi.spearman(log_efforts), hdi.kendall(log_efforts),
+        ))
+
+    return table
+
+# Dictionary version of 'sweep_array': exponent -> (pearson, spearman, kendall).
+def sweep(exponents: Iterable[float], data: Dict[str, np.ndarray] = None) -> Dict[float, Tuple[float, float, float]]:
+    exponents = list(exponents)
+
+    return dict(zip(exponents, map(tuple, sweep_array(exponents, data).tolist())))
+
+# Correlation methods, in the order returned by 'sweep_array'.
+METHODS = ('pearson', 'spearman', 'kendall')
+
+#  Find the exponent within [low, high] giving the minimum (goal='min') or maximum
+# (goal='max') correlation of a method. A coarse grid of 'grid_size' exponents is
+# evaluated in a single batch and the interval around its best point is then narrowed
+# down with a golden-section search until it is shorter than 'tolerance'. Returns the
+# optimal exponent, its correlation and how many exponents were evaluated.
+def optimize(method: str = 'pearson', goal: str = 'min', low: float = 1, high: float = 50.05, 
+             tolerance: float = 1e-8, grid_size: int = 30, data: Dict[str, np.ndarray] = None) -> Dict[str, float]:
+    if method not in METHODS:
+        raise ValueError(f'Invalid method: it must be one of {", ".join(METHODS)}.')
+
+    if goal not in {'min', 'max'}:
+        raise ValueError("Invalid goal: it must be either 'min' or 'max'.")
+
+    if grid_size < 3 or not low < high:
+        raise ValueError('Invalid range: it needs at least 3 grid points and low must be lower than high.')
+
+    data = load_data() if data is None else data
+    column = METHODS.index(method)
+    sign = 1 if goal == 'min' else -1
+
+    # Every objective is turned into a minimization.
+    def objective(exponents: List[float]) -> np.ndarray:
+        values = sign * sweep_array(exponents, data)[:, column]
+
+        return np.where(np.isnan(values), np.inf, values)
+
+    grid = np.linspace(low, high, grid_size)
+    values = objective(grid)
+    evaluations = grid_size
+
+    best = int(np.argmin(values))
+    best_exponent, best_value = grid[best], values[best]
+
+    # Golden-section search within the grid points next to the best one.
+    a, b = grid[max(best - 1, 0)], grid[min(best + 1, grid_size - 1)]
+    c, d = b - (b - a) / PHI, a + (b - a) / PHI
+    fc, fd = objective([c, d])
+    evaluations += 2
+
+    while b - a > tolerance:
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - (b - a) / PHI
+            fc = objective([c])[0]
+        else:
+            a, c, fc = c, d, fd
+            d = a + (b - a) / PHI
+            fd = objective([d])[0]
+
+        evaluations += 1
+
+    for exponent, value in ((c, fc), (d, fd)):
+        if value < best_value:
+            best_exponent, best_value = exponent, value
+
+    return {'exponent': float(best_exponent), 'correlation': float(sign * best_value), 'evaluations': evaluations}
 
 # Function to test correlations.
-def main(exponent: float or int) -> Tuple[float or int]:
-    # Tax effort function.
-    tax_effort = lambda tax_burden, unemployment, gdp_ppp: tax_burden / ((1 - tax_burden) * (1 - unemployment) * (gdp_ppp ** exponent))
-
-    # Get countries' data with which we will obtain their tax efforts.
-    df = pd.read_csv('data_extractor/data.csv')
-
-    # Relevant data of countries.
-    countries_data = []
-
-    #  Calculate the tax efforts and get Human Development Index to find if there is
-    # a correlation, and which exponent returns the highest.
-    for country_data in df.to_dict('records'):
-        tax_burden = country_data['tax_burden'] / 100
-        unemployment = country_data['unemployment'] / 100
-        gdp_ppp = country_data['gdp_per_capita_ppp']
-
-        countries_data.append([tax_effort(tax_burden, unemployment, gdp_ppp), country_data['hdi']])
-
-    # Final DataFrame with relevant data.
-    df = pd.DataFrame(countries_data, columns=['tax_effort', 'human development'])
-
-    # Return a tuple with correlations.
-    return (
-        df.corr(method='pearson').to_dict('records')[0]['human development'],
-        df.corr(method='spearman').to_dict('records')[0]['human development'],
-        df.corr(method='kendall').to_dict('records')[0]['human development']
-    )
-
-# Dictionary to hold exponents and their results.
-exponents = {}
-
-#  Create a list of indexes growing 0.01 every time
-# until reaching 50.05.
-indexes = [Decimal('1')]
-cap = Decimal('50.05')
-
-# Include golden number, e and pi.
-phi_done = False
-e_done = False
-pi_done = False
-
-# Add them to the indexes list.
-while indexes[-1] < cap:
-    addon = indexes[-1] + Decimal('0.01')
-    indexes.append(addon)
-
-    if addon < PHI and not phi_done:
-        indexes.append(Decimal(str(PHI)))
-        phi_done = True
-
-    if addon < e and not e_done:
-        indexes.append(Decimal(str(e)))
-        e_done = True
-
-    if addon < pi and not pi_done:
-        indexes.append(Decimal(str(pi)))
-        pi_done = True
-        
-# Try with each exponent in the list.
-for i in indexes:
-    dat = main(float(i))
-    exponents[i] = (dat[0], dat[1], dat[2])
-
-# Pearson, Spearman and Kendall maximum and minimum values.
-pearson_max = sorted(list(exponents.keys()), key=lambda k: exponents[k][0])[-1]
-spearman_max = sorted(list(exponents.keys()), key=lambda k: exponents[k][1])[-1]
-kendall_max = sorted(list(exponents.keys()), key=lambda k: exponents[k][2])[-1]
-
-pearson_min = sorted(list(exponents.keys()), key=lambda k: exponents[k][0])[0]
-spearman_min = sorted(list(exponents.keys()), key=lambda k: exponents[k][1])[0]
-kendall_min = sorted(list(exponents.keys()), key=lambda k: exponents[k][2])[0]
-
-# Show every correlation out of the ones before.
-print('Pearson max -> exponent =', pearson_max)
-print('Spearman max -> exponent =', spearman_max)
-print('Kendall max -> exponent =', kendall_max)
-
-print('-----')
-
-print('Pearson min -> exponent =', f'*{pearson_min}* (Chosen exponent)')
-print('Spearman min -> exponent =', spearman_min)
-print('Kendall min -> exponent =', kendall_min)
-
-print('-----')
-
-print("Pearson's maximum value according to its exponent", main(float(pearson_max)))
-print("Pearson's minimum value according to its exponent", main(float(pearson_min)))
+def main(exponent: float or int, data: Dict[str, np.ndarray] = None) -> Tuple[float or int]:
+    return tuple(sweep_array([exponent], data)[0].tolist())
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Find the exponents of GDP PPP giving the extreme correlations of tax efforts and HDIs.')
+    parser.add_argument('--optimize', action='store_true',
+                        help='search every extreme with a few tens of evaluations instead of sweeping the whole grid')
+    parser.add_argument('--low', type=float, default=1, help='lowest exponent searched by --optimize')
+    parser.add_argument('--high', type=float, default=50.05, help='highest exponent searched by --optimize')
+    parser.add_argument('--tolerance', type=float, default=1e-8,
+                        help='width of the interval where --optimize stops narrowing an extreme down')
+    parser.add_argument('--grid-size', type=int, default=30, help='exponents of the coarse grid of --optimize')
+    arguments = parser.parse_args()
+
+    if arguments.grid_size < 3 or not arguments.low < arguments.high or not arguments.tolerance > 0:
+        parser.error('invalid range: it needs at least 3 grid points, --low lower than --high and a positive tolerance')
+
+    # Load countries' data just once for the whole search.
+    data = load_data()
+
+    #  Optimizer mode: find the exponents of every method's maximum and minimum with a
+    # few tens of evaluations each, instead of trying the whole grid below.
+    if arguments.optimize:
+        for method in METHODS:
+            for goal in ('max', 'min'):
+                result = optimize(method, goal, arguments.low, arguments.high, arguments.tolerance, arguments.grid_size, data)
+
+                print(f'{method.capitalize()} {goal} -> exponent = {result["exponent"]}',
+                      f'(correlation: {result["correlation"]}, evaluations: {result["evaluations"]})')
+
+        sys.exit()
+
+    #  Create a list of indexes growing 0.01 every time
+    # until reaching 50.05.
+    indexes = [Decimal('1')]
+    cap = Decimal('50.05')
+
+    # Include golden number, e and pi.
+    phi_done = False
+    e_done = False
+    pi_done = False
+
+    # Add them to the indexes list.
+    while indexes[-1] < cap:
+        addon = indexes[-1] + Decimal('0.01')
+        indexes.append(addon)
+
+        if addon < PHI and not phi_done:
+            indexes.append(Decimal(str(PHI)))
+            phi_done = True
+
+        if addon < e and not e_done:
+            indexes.append(Decimal(str(e)))
+            e_done = True
+
+        if addon < pi and not pi_done:
+            indexes.append(Decimal(str(pi)))
+            pi_done = True
+
+    # Try every exponent in the list in a single batch.
+    table = sweep_array(indexes, data)
+
+    # Pearson, Spearman and Kendall maximum and minimum values.
+    pearson_max, spearman_max, kendall_max = (indexes[i] for i in np.nanargmax(table, axis=0))
+    pearson_min, spearman_min, kendall_min = (indexes[i] for i in np.nanargmin(table, axis=0))
+
+    # Show every correlation out of the ones before.
+    print('Pearson max -> exponent =', pearson_max)
+    print('Spearman max -> exponent =', spearman_max)
+    print('Kendall max -> exponent =', kendall_max)
+
+    print('-----')
+
+    print('Pearson min -> exponent =', f'*{pearson_min}* (Chosen exponent)')
+    print('Spearman min -> exponent =', spearman_min)
+    print('Kendall min -> exponent =', kendall_min)
+
+    print('-----')
+
+    print("Pearson's maximum value according to its exponent", main(float(pearson_max), data))
+    print("Pearson's minimum value according to its exponent", main(float(pearson_min), data))
 
 '''
     Conclusion: We have chosen the golden number as an exponent because it is the one 
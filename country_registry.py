@@ -0,0 +1,124 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from csv import DictReader, writer
+from functools import lru_cache
+from glob import glob
+from typing import Dict, List
+
+# Table with every country's ISO3 code, canonical name and the other spellings used by the sources.
+REGISTRY_PATH = 'datasets/countries.csv'
+
+#  Spellings used by the International Monetary Fund that neither the World Bank nor
+# OurWorldInData use (the IMF workbooks do not include ISO3 codes), along with the
+# OurWorldInData codes which are not ISO3 ones.
+MANUAL_ALIASES = {
+    "China, People's Republic of": 'CHN',
+    'Congo, Dem. Rep. of the': 'COD',
+    'Congo, Republic of': 'COG',
+    'Czech Republic': 'CZE',
+    "Côte d'Ivoire": 'CIV',
+    'Hong Kong SAR': 'HKG',
+    'Korea, Republic of': 'KOR',
+    'Lao P.D.R.': 'LAO',
+    'Macao SAR': 'MAC',
+    'Micronesia, Fed. States of': 'FSM',
+    'South Sudan, Republic of': 'SSD',
+    'São Tomé and Príncipe': 'STP',
+    'Taiwan Province of China': 'TWN',
+    'Türkiye, Republic of': 'TUR',
+    'OWID_KOS': 'XKX',
+}
+
+#  World Bank codes of regions, income groups, lending groups and other aggregates. They
+# are not countries, so they are left out of the registry and their rows are skipped.
+AGGREGATES = frozenset({
+    'AFE', 'AFW', 'ARB', 'CEB', 'CSS', 'EAP', 'EAR', 'EAS', 'ECA', 'ECS', 'EMU', 'EUU', 'FCS', 'HIC', 'HPC', 'IBD', 'IBT',
+    'IDA', 'IDB', 'IDX', 'INX', 'LAC', 'LCN', 'LDC', 'LIC', 'LMC', 'LMY', 'LTE', 'MEA', 'MIC', 'MNA', 'NAC', 'OED', 'OSS',
+    'PRE', 'PSS', 'PST', 'SAS', 'SSA', 'SSF', 'SST', 'TEA', 'TEC', 'TLA', 'TMN', 'TSA', 'TSS', 'UMC', 'WLD',
+})
+
+#  Countries known by every source. Each country has an integer id (its position in
+# 'codes' and 'names') and every spelling of its name, as well as its ISO3 code, is
+# an alias of that id.
+class CountryRegistry:
+    __slots__ = 'codes', 'names', 'aliases'
+
+    def __init__(self, codes: List[str], names: List[str], aliases: Dict[str, int]):
+        self.codes = codes
+        self.names = names
+        self.aliases = aliases
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    # Integer id of any spelling or code of a country, or None if it is unknown (e.g. regions).
+    def resolve(self, alias: str) -> int | None:
+        return self.aliases.get(alias.strip())
+
+    def name(self, country_id: int) -> str:
+        return self.names[country_id]
+
+    def code(self, country_id: int) -> str:
+        return self.codes[country_id]
+
+# Load the registry from 'REGISTRY_PATH'.
+def load_registry(path: str = REGISTRY_PATH) -> CountryRegistry:
+    codes = []
+    names = []
+    aliases = {}
+
+    with open(path, 'r', encoding='utf-8') as file:
+        for country_id, row in enumerate(DictReader(file)):
+            codes.append(row['code'])
+            names.append(row['name'])
+
+            for alias in (row['code'], row['name'], *filter(None, row['aliases'].split('|'))):
+                aliases[alias] = country_id
+
+    return CountryRegistry(codes, names, aliases)
+
+# Registry shared by every reader, loaded only once.
+@lru_cache(maxsize=None)
+def default_registry() -> CountryRegistry:
+    return load_registry()
+
+#  Build 'REGISTRY_PATH' from the sources in 'datasets/'. World Bank names are the
+# canonical ones (the same ones used across the scripts, like 'Korea, Rep.') and
+# OurWorldInData names, whose ISO3 codes come with them, are taken as aliases.
+def build_registry(path: str = REGISTRY_PATH) -> None:
+    from openpyxl import load_workbook
+
+    names = {}
+    aliases = {}
+
+    wb = load_workbook('datasets/World_Bank/WB_Unemployment.xlsx', read_only=True)
+    for row in list(wb.active.iter_rows(values_only=True))[1:]:
+        if row[0] and row[1] and row[1] not in AGGREGATES:
+            names[row[1]] = row[0].strip()
+    wb.close()
+
+    for owid_path in sorted(glob('datasets/Our_World_In_Data/*.csv')):
+        with open(owid_path, 'r') as file:
+            for row in DictReader(file):
+                code = MANUAL_ALIASES.get(row['Code'], row['Code'])
+
+                if len(code) == 3 and code not in AGGREGATES:
+                    names.setdefault(code, row['Entity'])
+                    aliases.setdefault(code, set()).add(row['Entity'])
+
+    for alias, code in MANUAL_ALIASES.items():
+        aliases.setdefault(code, set()).add(alias)
+
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        table = writer(file)
+        table.writerow(('code', 'name', 'aliases'))
+
+        for code in sorted(names):
+            table.writerow((code, names[code], '|'.join(sorted(aliases.get(code, set()) - {names[code]}))))
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Build the registry of countries from the sources in datasets/.')
+    parser.add_argument('--output', default=REGISTRY_PATH, help=f'CSV file to write the registry to ({REGISTRY_PATH} by default)')
+    arguments = parser.parse_args()
+
+    build_registry(arguments.output)
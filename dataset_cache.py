@@ -0,0 +1,99 @@
+from __future__ import annotations
+from contextlib import suppress
+from hashlib import sha256
+from typing import Dict, Iterable
+from zipfile import BadZipFile
+import os
+
+import numpy as np
+
+# Directory where parsed datasets are kept and the maximum size it may grow to (in bytes).
+CACHE_DIR = '.cache'
+MAX_CACHE_SIZE = 256 * 1024 ** 2
+
+# Hash of a file's content, read in blocks so big files are not loaded into memory.
+def file_hash(path: str) -> str:
+    digest = sha256()
+
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 ** 2), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+#  Key identifying a parsed dataset: the content of every source file it comes from
+# plus anything else its result depends on (parser version, columns read, etc.).
+# Whenever a source file changes, so does the key.
+def cache_key(paths: Iterable[str], *extra) -> str:
+    digest = sha256()
+
+    for path in paths:
+        digest.update(file_hash(path).encode())
+
+    digest.update(repr(extra).encode())
+
+    return digest.hexdigest()
+
+def cache_path(key: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f'{key}.npz')
+
+#  Arrays saved under a key, or None if they are not cached. Every hit refreshes the
+# file's modification time, which is what the eviction uses to find the least
+# recently used entries. Damaged entries (e.g. truncated files) are removed and
+# count as misses, so they are built again.
+def load_arrays(key: str, cache_dir: str = CACHE_DIR) -> Dict[str, np.ndarray] | None:
+    path = cache_path(key, cache_dir)
+
+    try:
+        with np.load(path, allow_pickle=False) as file:
+            arrays = {name: file[name] for name in file.files}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, BadZipFile):
+        with suppress(OSError):
+            os.remove(path)
+
+        return None
+
+    os.utime(path)
+
+    return arrays
+
+#  Save arrays under a key. They are written to a temporary file first, so an
+# interrupted run never leaves a broken entry behind.
+def save_arrays(key: str, arrays: Dict[str, np.ndarray], cache_dir: str = CACHE_DIR,
+                max_size: int = MAX_CACHE_SIZE) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = cache_path(key, cache_dir)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as file:
+        np.savez(file, **arrays)
+
+    os.replace(temporary_path, path)
+
+    evict(cache_dir, max_size)
+
+# Remove the least recently used entries until the cache fits in 'max_size' bytes.
+def evict(cache_dir: str = CACHE_DIR, max_size: int = MAX_CACHE_SIZE) -> None:
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.npz'):
+            continue
+
+        stat = os.stat(os.path.join(cache_dir, name))
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    total_size = sum(entry[1] for entry in entries)
+
+    for _, size, name in sorted(entries):
+        if total_size <= max_size:
+            break
+
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass
+
+        total_size -= size
@@ -1,12 +1,15 @@
 from __future__ import annotations
+from argparse import ArgumentParser
 from dataclasses import dataclass
-from typing import List, Tuple
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
 from math import sqrt
-from csv import DictReader
 
-from openpyxl import load_workbook, Workbook
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+from instrumentation import emit, span, timed
+from panel import Panel, load_panel
+from regression import polynomial_fit
 
 # List of countries to study.
 exemplary_countries = ('Singapore', 'Ireland', 'Korea, Rep.')
@@ -15,16 +18,18 @@ example_countries = ('Spain', 'France', 'Italy', 'United Kingdom', 'United State
 
 # Helper functions to use later.
 PHI = (1 + sqrt(5)) / 2
-def tax_effort(tax_burden: float, unemployment: float, gdp_ppp_per_capita: int | float):
-    for percentage, parameter_title in {(tax_burden, 'tax burden'), (unemployment, 'unemployment')}:
-        if percentage > 1 or percentage < 0:
+def tax_effort(tax_burden: float | np.ndarray, unemployment: float | np.ndarray, gdp_ppp_per_capita: int | float | np.ndarray):
+    for percentage, parameter_title in ((tax_burden, 'tax burden'), (unemployment, 'unemployment')):
+        if np.any((percentage > 1) | (percentage < 0)):
             raise ValueError(f'Invalid {parameter_title}: it must be a (positive) percentage represented as a number from 0 to 1, both included.')
     
     return tax_burden / ((1 - tax_burden) * (1 - unemployment) * (gdp_ppp_per_capita ** PHI))
 
-# Helper dataclass for countries' general data.
+# Helper dataclass for countries' general data (of a single year).
 @dataclass
 class Country:
+    __slots__ = 'country_name', 'year', 'tax_burden', 'unemployment', 'gdp_ppp_per_capita', 'real_gdp_per_capita'
+
     country_name: str
     year: int
 
@@ -38,18 +43,78 @@ class Country:
     def tax_effort(self) -> float:
         return tax_effort(self.tax_burden, self.unemployment, self.gdp_ppp_per_capita)
 
-# Helper dataclass for countries' real GDP per capita data.
-@dataclass
+#  Countries' general data of every year, sorted by year, as an array per field. Tax
+# efforts are computed (and validated) for the whole history the first time they are
+# needed and kept afterwards. Indexing it gives the 'Country' of a single year.
+class CountryHistory:
+    __slots__ = 'country_name', 'years', 'tax_burden', 'unemployment', 'gdp_ppp_per_capita', 'real_gdp_per_capita', '_tax_effort'
+
+    def __init__(self, country_name: str, years: np.ndarray, tax_burden: np.ndarray, unemployment: np.ndarray, 
+                 gdp_ppp_per_capita: np.ndarray, real_gdp_per_capita: np.ndarray):
+        self.country_name = country_name
+        self.years = np.ascontiguousarray(years, dtype=np.int64)
+
+        self.tax_burden = np.ascontiguousarray(tax_burden, dtype=float)
+        self.unemployment = np.ascontiguousarray(unemployment, dtype=float)
+        self.gdp_ppp_per_capita = np.ascontiguousarray(gdp_ppp_per_capita, dtype=float)
+
+        self.real_gdp_per_capita = np.ascontiguousarray(real_gdp_per_capita, dtype=float)
+
+        self._tax_effort = None
+
+    @property
+    def tax_effort(self) -> np.ndarray:
+        if self._tax_effort is None:
+            self._tax_effort = tax_effort(self.tax_burden, self.unemployment, self.gdp_ppp_per_capita)
+
+        return self._tax_effort
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def __getitem__(self, index: int) -> Country:
+        return Country(self.country_name, int(self.years[index]), float(self.tax_burden[index]), float(self.unemployment[index]),
+                       float(self.gdp_ppp_per_capita[index]), float(self.real_gdp_per_capita[index]))
+
+# Helper class for countries' real GDP per capita data of every year, sorted by year.
 class RealGDP:
-    __slots__ = 'country_name', 'year', 'real_gdp'
+    __slots__ = 'country_name', 'years', 'real_gdp'
 
-    country_name: str
-    year: int
+    def __init__(self, country_name: str, years: np.ndarray, real_gdp: np.ndarray):
+        self.country_name = country_name
+        self.years = np.ascontiguousarray(years, dtype=np.int64)
 
-    real_gdp: float
-    
+        self.real_gdp = np.ascontiguousarray(real_gdp, dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+# Fields of 'CountryHistory' with a summary in 'summaries'.
+SUMMARY_FIELDS = ('tax_burden', 'unemployment', 'gdp_ppp_per_capita', 'real_gdp_per_capita', 'tax_effort')
+
+#  Summary statistics of a field of a country's history: median, mean and (population)
+# standard deviation, first and last years and values, minimum and maximum.
+class Summary:
+    __slots__ = 'median', 'mean', 'std', 'first_year', 'last_year', 'first', 'last', 'minimum', 'maximum'
+
+    def __init__(self, years: np.ndarray, values: np.ndarray):
+        self.median = float(np.median(values))
+        self.mean = float(values.mean())
+        self.std = float(values.std())
+
+        self.first_year, self.last_year = int(years[0]), int(years[-1])
+        self.first, self.last = float(values[0]), float(values[-1])
+
+        self.minimum, self.maximum = float(values.min()), float(values.max())
+
+    # Standard score of a value against the field's distribution.
+    def normalize(self, element: int | float) -> float:
+        return (element - self.mean) / self.std
+
+def get_median(series: List[int | float] | np.ndarray) -> float:
+    if isinstance(series, np.ndarray):
+        return float(np.median(series))
 
-def get_median(series: List[int | float]) -> float:
     series.sort()
     length = len(series)
     if length % 2 == 0:
@@ -57,9 +122,12 @@ def get_median(series: List[int | float]) -> float:
     else:
         return series[length // 2]
 
-def normalize(series: List[int | float] | Tuple[int | float], element: int | float = None) -> List[float] | float:
-    if not isinstance(series, (list, tuple)):
+def normalize(series: List[int | float] | Tuple[int | float] | np.ndarray, element: int | float = None) -> List[float] | float:
+    if not isinstance(series, (list, tuple, np.ndarray)):
         raise ValueError()
+
+    if isinstance(series, np.ndarray):
+        return (element - series.mean()) / series.std() if element is not None else list((series - series.mean()) / series.std())
     
     mean = sum(series) / len(series)
 
@@ -68,170 +136,205 @@ def normalize(series: List[int | float] | Tuple[int | float], element: int | flo
     return (element - mean) / std if element is not None else [(data_point - mean) / std for data_point in series]
 
 
-def get_common_min(series1: List[Country] | Tuple[Country], series2: List[Country] | Tuple[Country]):
-    initially_upper = series1 if series1[0].real_gdp_per_capita > series2[0].real_gdp_per_capita else series2
-    initially_lower = series1 if series1[0].real_gdp_per_capita <= series2[0].real_gdp_per_capita else series2
+#  Real GDP per capita of every country in 'data', sorted once, so the year when a country's
+# real GDP was the closest to any value is found by binary search, for many countries and
+# values at once. Countries (identified by their 'codes') are stored one after another:
+# from 'starts[code]' to 'ends[code]', 'values' holds the country's sorted real GDPs and
+# 'positions' where each one is in its history (equal values from the earliest one).
+class RealGDPIndex:
+    __slots__ = 'codes', 'starts', 'ends', 'years', 'first', 'last', 'values', 'positions', 'run_starts', 'distinct', 'keys'
 
-    AMIN = min(initially_upper, key=lambda country: (country.real_gdp_per_capita, country.year))
-    BMIN = min(initially_lower, key=lambda country: (abs(country.real_gdp_per_capita - AMIN.real_gdp_per_capita), country.year))
+    def __init__(self, histories: List[CountryHistory]):
+        self.codes = {history.country_name: code for code, history in enumerate(histories)}
 
-    return {AMIN.country_name: AMIN, BMIN.country_name: BMIN}
+        lengths = np.array([len(history) for history in histories], dtype=np.int64)
+        self.ends = np.cumsum(lengths)
+        self.starts = self.ends - lengths
 
-def get_common_max(series1: List[Country] | Tuple[Country], series2: List[Country] | Tuple[Country]):
-    finally_upper = series1 if series1[-1].real_gdp_per_capita > series2[-1].real_gdp_per_capita else series2
-    finally_lower = series1 if series1[-1].real_gdp_per_capita <= series2[-1].real_gdp_per_capita else series2
+        # Years in the order of the histories, so 'years[starts[code] + position]' is a year of 'code'.
+        self.years = np.concatenate([history.years for history in histories] or [np.empty(0, dtype=np.int64)])
 
-    AMAX = max(finally_lower, key=lambda country: (country.real_gdp_per_capita, country.year))
-    BMAX = min(finally_upper, key=lambda country: (abs(country.real_gdp_per_capita - AMAX.real_gdp_per_capita), country.year))
+        segments = np.repeat(np.arange(len(histories)), lengths)
+        values = np.concatenate([history.real_gdp_per_capita for history in histories] or [np.empty(0)])
+        positions = np.arange(len(values)) - self.starts[segments]
 
-    return {AMAX.country_name: AMAX, BMAX.country_name: BMAX}
+        # Real GDP of the first and last years of every country.
+        self.first, self.last = values[self.starts], values[self.ends - 1]
 
+        order = np.lexsort((positions, values, segments))
+        self.values, self.positions = values[order], positions[order]
 
-### LOADING DATA ###
-wb = load_workbook('datasets/World_Bank/WB_Unemployment.xlsx')
+        # First entry of the group of equal values (of the same country) every entry belongs to.
+        run_starts = np.ones(len(values), dtype=bool)
+        run_starts[1:] = (self.values[1:] != self.values[:-1]) | (segments[order][1:] != segments[order][:-1])
+        self.run_starts = np.maximum.accumulate(np.where(run_starts, np.arange(len(values)), 0))
 
-ws = wb.active
+        #  Integer keys sorted like (country, value), so a single 'np.searchsorted' finds a value
+        # within the values of any country: every value is replaced by its rank among all of
+        # them (the distinct ones), which keeps their order.
+        self.distinct = np.unique(values)
+        self.keys = segments[order] * (len(self.distinct) + 1) + np.searchsorted(self.distinct, self.values)
 
-countries = {}
+    #  Position, in every country's history, of the real GDP per capita closest to the target
+    # given for it (the earliest year in case of ties), for any number of countries at once.
+    def nearest(self, codes: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        codes, targets = np.asarray(codes, dtype=np.int64), np.asarray(targets, dtype=float)
+        starts, ends = self.starts[codes], self.ends[codes]
 
-### Unemployment rates ###
-for row in range(1, ws.max_row + 1):
-    country_name = ws.cell(row=row, column=1).value
+        #  First value not below the target (or the end of the country's values): values not
+        # below the target are the ones ranked at least where the target would be.
+        low = np.searchsorted(self.keys, codes * (len(self.distinct) + 1) + np.searchsorted(self.distinct, targets))
 
-    last_year = None
-    column = 4
-    while last_year != 2021:
-        column += 1
-        
-        last_year = int(ws.cell(row=1, column=column).value)
+        # The closest value is either that one or the biggest one below the target.
+        above, below = np.minimum(low, len(self.values) - 1), self.run_starts[np.maximum(low - 1, 0)]
+        above_distance = np.where(low < ends, np.abs(self.values[above] - targets), np.inf)
+        below_distance = np.where(low > starts, np.abs(self.values[below] - targets), np.inf)
 
-        countries.setdefault(last_year, {})
-        countries[last_year].setdefault(country_name, {'tax_burden': None, 'unemployment': None, 
-                                                        'gdp_ppp_per_capita': None, 'real_gdp_per_capita': None})
+        use_below = (below_distance < above_distance) | (
+            (below_distance == above_distance) & (self.positions[below] < self.positions[above])
+        )
 
-        value = ws.cell(row=row, column=column).value
-        try:
-            countries[last_year][country_name]['unemployment'] = float(value) / 100
-        except Exception:
-            continue
+        return np.where(use_below, self.positions[below], self.positions[above])
 
-wb.close()
+    #  Positions of the common minimum and maximum of every pair of countries ('codes1[i]',
+    # 'codes2[i]'), as (minimum of the first ones, minimum of the second ones, maximum of the
+    # first ones, maximum of the second ones). The common minimum starts from the minimum of
+    # the country that was richer at the beginning (the earliest year of it), matched with
+    # the closest real GDP of the other one; the common maximum, from the maximum of the one
+    # that was poorer at the end (the latest year of it).
+    def common_positions(self, codes1: np.ndarray, codes2: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        codes1, codes2 = np.asarray(codes1, dtype=np.int64), np.asarray(codes2, dtype=np.int64)
+        pairs = len(codes1)
 
-### Tax burdens ###
-with open('datasets/Our_World_In_Data/OWID_Total_Tax_Revenues_GDP.csv', 'r') as file:
-    data = DictReader(file)
+        #  Whether the extreme is taken from the first country of the pair (and matched in the
+        # second one) or the other way round, for the minimums followed by the maximums.
+        first_anchors = np.concatenate((self.first[codes1] > self.first[codes2], self.last[codes1] <= self.last[codes2]))
+        twice1, twice2 = np.concatenate((codes1, codes1)), np.concatenate((codes2, codes2))
+        anchors, matched = np.where(first_anchors, twice1, twice2), np.where(first_anchors, twice2, twice1)
 
-    for row in data:
-        country_name = row['Entity']
-        country_name = country_name.replace('South Korea', 'Korea, Rep.')
+        # Sorted values start with the minimum (earliest year) and end with the maximum (latest year).
+        extremes = np.concatenate((self.starts[anchors[:pairs]], self.ends[anchors[pairs:]] - 1))
+        anchor_positions = self.positions[extremes]
+        matched_positions = self.nearest(matched, self.values[extremes])
 
-        last_year = int(row['Year'])
+        # When both countries are the same one, the matched position is used for both.
+        same = twice1 == twice2
+        positions1 = np.where(first_anchors & ~same, anchor_positions, matched_positions)
+        positions2 = np.where(first_anchors | same, matched_positions, anchor_positions)
 
-        countries.setdefault(last_year, {})
-        countries[last_year].setdefault(country_name, {'tax_burden': None, 'unemployment': None, 
-                                                        'gdp_ppp_per_capita': None, 'real_gdp_per_capita': None})
+        return positions1[:pairs], positions2[:pairs], positions1[pairs:], positions2[pairs:]
 
-        countries[last_year][country_name]['tax_burden'] = float(row[r'Total tax revenue (% of GDP) (ICTD (2021))']) / 100
+    def year(self, codes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        return self.years[self.starts[codes] + positions]
 
-### GDPs Per Capita ###
-wb = load_workbook('datasets/International_Monetary_Fund/IMF_GDP_Per_Capita_PPP.xlsx')
+#  Years where both countries had the closest real GDP per capita, starting from the minimum of
+# the one that was richer at the beginning (see 'RealGDPIndex.common_positions').
+def get_common_min(series1: CountryHistory, series2: CountryHistory) -> Dict[str, Country]:
+    codes = [real_gdp_index.codes[series1.country_name]], [real_gdp_index.codes[series2.country_name]]
+    minimum1, minimum2, _, _ = real_gdp_index.common_positions(*codes)
 
-ws = wb.active
+    return {series1.country_name: series1[minimum1[0]], series2.country_name: series2[minimum2[0]]}
 
-for row in range(1, ws.max_row + 1):
-    country_name = ws.cell(row=row, column=1).value
-    
-    if isinstance(country_name, str):
-        country_name = country_name.replace('Korea, Republic of', 'Korea, Rep.')
+#  Years where both countries had the closest real GDP per capita, starting from the maximum of
+# the one that was poorer at the end (see 'RealGDPIndex.common_positions').
+def get_common_max(series1: CountryHistory, series2: CountryHistory) -> Dict[str, Country]:
+    codes = [real_gdp_index.codes[series1.country_name]], [real_gdp_index.codes[series2.country_name]]
+    _, _, maximum1, maximum2 = real_gdp_index.common_positions(*codes)
 
-    last_year = None
-    column = 1
-    while last_year != 2021:
-        column += 1
+    return {series1.country_name: series1[maximum1[0]], series2.country_name: series2[maximum2[0]]}
 
-        last_year = int(ws.cell(row=1, column=column).value)
-        
-        countries.setdefault(last_year, {})
-        countries[last_year].setdefault(country_name, {'tax_burden': None, 'unemployment': None, 
-                                                        'gdp_ppp_per_capita': None, 'real_gdp_per_capita': None})
 
-        value = ws.cell(row=row, column=column).value
-        try:
-            countries[last_year][country_name]['gdp_ppp_per_capita'] = float(value)
-        except Exception:
-            continue
+### LOADING DATA ###
+#  Countries' histories, sorted by year. Countries without any complete year are
+# left out of 'data' and the ones without real GDP out of 'real_gdp_history'.
+data = {}
+real_gdp_history = {}
 
-wb.close()
+#  Summary statistics of every field (see 'SUMMARY_FIELDS') of every country in 'data',
+# computed once when loading it: country -> field -> summary.
+summaries: Dict[str, Dict[str, Summary]] = {}
 
-### Real GDPs Per Capita ###
-with open('datasets/Our_World_In_Data/OWID_GDP_Per_Capita_In_US_Dollar_World_Bank.csv', 'r') as file:
-    data = DictReader(file)
+# Sorted real GDP per capita of every country in 'data'.
+real_gdp_index: RealGDPIndex = None
 
-    for row in data:
-        country_name = row['Entity']
-        country_name = country_name.replace('South Korea', 'Korea, Rep.')
+#  Linear trend, as (intercept, slope), of every country's real GDP per capita against
+# the years passed since its first value.
+real_gdp_trends = {}
 
-        last_year = int(row['Year'])
+#  Fill 'data', 'real_gdp_history' and their summaries from a panel (by default, the one loaded from
+# 'datasets/'). It must be called before using 'core'. Trends already known (country -> (intercept,
+# slope), e.g. kept up to date by 'incremental') are used instead of fitting them.
+def load_data(panel: Panel = None, trends: Dict[str, Tuple[float, float]] = None) -> None:
+    global real_gdp_index
 
-        countries.setdefault(last_year, {})
-        countries[last_year].setdefault(country_name, {'tax_burden': None, 'unemployment': None, 
-                                                        'gdp_ppp_per_capita': None, 'real_gdp_per_capita': None})
+    if panel is None:
+        panel = load_panel(('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp'))
 
-        countries[last_year][country_name]['real_gdp_per_capita'] = float(row['GDP per capita (constant 2015 US$)'])
+    complete = panel.complete('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp')
+    has_real_gdp = panel.mask('real_gdp')
 
-data = {}
-real_gdp_history = {}
-for year in countries:
-    for country_name in countries[year]:
-        data.setdefault(country_name, [])
-        real_gdp_history.setdefault(country_name, [])
-
-        if countries[year][country_name]['real_gdp_per_capita'] is not None:
-            real_gdp_history[country_name].append(RealGDP(
-                country_name=country_name, 
-                year=year, 
-                real_gdp=countries[year][country_name]['real_gdp_per_capita']    
-            ))
-
-        if (countries[year][country_name]['tax_burden'] is None
-            or countries[year][country_name]['unemployment'] is None
-            or countries[year][country_name]['gdp_ppp_per_capita'] is None
-            or countries[year][country_name]['real_gdp_per_capita'] is None):
-            continue
+    data.clear()
+    real_gdp_history.clear()
+    summaries.clear()
+    real_gdp_trends.clear()
 
-        data[country_name].append(Country(
-            country_name=country_name, 
-            year=year,
-            tax_burden=countries[year][country_name]['tax_burden'],
-            unemployment=countries[year][country_name]['unemployment'],
-            gdp_ppp_per_capita=countries[year][country_name]['gdp_ppp_per_capita'],
-            real_gdp_per_capita=countries[year][country_name]['real_gdp_per_capita'],
-        ))
-
-### REMOVING MISSING DATA ###
-for country_name in set(data.keys()):
-    if len(data[country_name]):
-        data[country_name].sort(key=lambda country: country.year)
-    else:
-        del data[country_name]
+    # Every country's trend is fitted at once.
+    if trends is None:
+        first_years = panel.years[np.argmax(has_real_gdp, axis=1)]
+        with span('regression.real_gdp'):
+            fitted = polynomial_fit(panel.years[np.newaxis, :] - first_years[:, np.newaxis], panel['real_gdp'], 1)
 
-    if len(real_gdp_history[country_name]):
-        real_gdp_history[country_name].sort(key=lambda country: country.year)
-    else:
-        del real_gdp_history[country_name]
+        trends = {country_name: tuple(fitted[code].tolist()) for code, country_name in enumerate(panel.countries)}
+
+    with span('join.countries'):
+        for code, country_name in enumerate(panel.countries):
+            if has_real_gdp[code].any():
+                real_gdp_history[country_name] = RealGDP(country_name, panel.years[has_real_gdp[code]], 
+                                                         panel['real_gdp'][code, has_real_gdp[code]])
+                real_gdp_trends[country_name] = trends[country_name]
+
+            if complete[code].any():
+                data[country_name] = CountryHistory(
+                    country_name, 
+                    panel.years[complete[code]],
+                    *(panel[indicator][code, complete[code]] for indicator in ('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp'))
+                )
+
+    with span('compute.summaries'):
+        for country_name, history in data.items():
+            summaries[country_name] = {field: Summary(history.years, getattr(history, field)) for field in SUMMARY_FIELDS}
+
+        real_gdp_index = RealGDPIndex(list(data.values()))
+
+#  Make sure every country of the given exemplary sets has data (is in 'countries', the ones
+# in 'data' by default), as 'core' needs the history of every exemplary country.
+def check_exemplary_sets(exemplary_sets: Iterable[Tuple[str]], countries: Iterable[str] = None) -> None:
+    countries = data if countries is None else set(countries)
+    missing = sorted({country_name for exemplary_countries in exemplary_sets for country_name in exemplary_countries
+                      if country_name not in countries})
+
+    if missing:
+        raise ValueError(f'Invalid exemplary countries (without data): {", ".join(missing)}.')
 
 ### USING THE DATA ###
 
 # Calculating lambdas.
-def core(example_country):
-    lambdas = {}
-    for exemplary_country in exemplary_countries:
-        common_min = get_common_min(data[exemplary_country], data[example_country])
-        common_max = get_common_max(data[exemplary_country], data[example_country])
-
-        example_country_difference = common_max[example_country].year - common_min[example_country].year
-        exemplary_country_difference = common_max[exemplary_country].year - common_min[exemplary_country].year
+@timed('compute.core')
+def core(example_country: str, exemplary_countries: Tuple[str] = exemplary_countries):
+    # Common minimums and maximums against every exemplary country at once.
+    exemplary_codes = [real_gdp_index.codes[exemplary_country] for exemplary_country in exemplary_countries]
+    example_codes = [real_gdp_index.codes[example_country]] * len(exemplary_codes)
+    exemplary_minimums, example_minimums, exemplary_maximums, example_maximums = real_gdp_index.common_positions(exemplary_codes, example_codes)
+
+    exemplary_differences = (real_gdp_index.year(exemplary_codes, exemplary_maximums) 
+                             - real_gdp_index.year(exemplary_codes, exemplary_minimums)).tolist()
+    example_differences = (real_gdp_index.year(example_codes, example_maximums) 
+                           - real_gdp_index.year(example_codes, example_minimums)).tolist()
 
+    lambdas = {}
+    for exemplary_country, exemplary_country_difference, example_country_difference in zip(
+        exemplary_countries, exemplary_differences, example_differences
+    ):
         try:
             lambdas[exemplary_country] = (example_country_difference / exemplary_country_difference, exemplary_country_difference)
         except ZeroDivisionError:
@@ -239,36 +342,32 @@ def core(example_country):
 
     # Calculating weights.
     # Median tax efforts, median real GDP per capita and the inverse of lambda intervals.
+    example = summaries[example_country]
     median_tax_efforts = {
-        country_name:
-        normalize([instance.tax_effort for instance in data[country_name]], 
-                get_median([instance.tax_effort for instance in data[country_name]])) 
-        
+        country_name: summaries[country_name]['tax_effort'].normalize(summaries[country_name]['tax_effort'].median)
         for country_name in exemplary_countries
     }
 
     tax_burden_goal = sum([
         
-        (get_median([instance.tax_burden for instance in data[exemplary_country]]) 
-            * (1 - get_median([instance.unemployment for instance in data[example_country]])) 
-            * (get_median([instance.gdp_ppp_per_capita for instance in data[example_country]]) ** PHI))
+        (summaries[exemplary_country]['tax_burden'].median 
+            * (1 - example['unemployment'].median) 
+            * (example['gdp_ppp_per_capita'].median ** PHI))
         /
-        ((1 - get_median([instance.tax_burden for instance in data[exemplary_country]])) 
-            * (1 - get_median([instance.unemployment for instance in data[exemplary_country]]))
-            * ((get_median([instance.gdp_ppp_per_capita for instance in data[exemplary_country]])) ** PHI)
+        ((1 - summaries[exemplary_country]['tax_burden'].median) 
+            * (1 - summaries[exemplary_country]['unemployment'].median)
+            * (summaries[exemplary_country]['gdp_ppp_per_capita'].median ** PHI)
         +
-            get_median([instance.tax_burden for instance in data[exemplary_country]])
-            * (1 - get_median([instance.unemployment for instance in data[example_country]]))
-            * (get_median([instance.gdp_ppp_per_capita for instance in data[example_country]]) ** PHI))
+            summaries[exemplary_country]['tax_burden'].median
+            * (1 - example['unemployment'].median)
+            * (example['gdp_ppp_per_capita'].median ** PHI))
         
         for exemplary_country in exemplary_countries]) / len(exemplary_countries)
 
-    resulting_median_tax_effort = tax_effort(tax_burden_goal, 
-                                      get_median([instance.unemployment for instance in data[example_country]]), 
-                                      get_median([instance.gdp_ppp_per_capita for instance in data[example_country]]))
+    resulting_median_tax_effort = tax_effort(tax_burden_goal, example['unemployment'].median, 
+                                             example['gdp_ppp_per_capita'].median)
 
-    median_tax_efforts[example_country] = normalize([instance.tax_effort for instance in data[example_country]], 
-                resulting_median_tax_effort) 
+    median_tax_efforts[example_country] = example['tax_effort'].normalize(resulting_median_tax_effort)
 
     try:
         interval_inverses = [1 / lambdas[country_name][1] for country_name in exemplary_countries]
@@ -306,46 +405,118 @@ def core(example_country):
 
     FINAL_LAMBDA = sum([lambdas[exemplary_country][0] * weights[exemplary_country] for exemplary_country in exemplary_countries])
 
-    x = np.array([
-        instance.year - real_gdp_history[example_country][0].year for instance in real_gdp_history[example_country]
-    ]).reshape(-1, 1)
+    intercept, slope = real_gdp_trends[example_country]
 
-    y = np.array([instance.real_gdp for instance in real_gdp_history[example_country]])
-
-    approximate_alpha_function = LinearRegression()
-    approximate_alpha_function.fit(x, y)
-
-    alpha_star = lambda x: FINAL_LAMBDA * approximate_alpha_function.coef_[0] * x + approximate_alpha_function.intercept_
+    alpha_star = lambda x: FINAL_LAMBDA * slope * x + intercept
 
     return {'country_name': example_country, 
             'years': {country_name: lambdas[country_name][1] for country_name in exemplary_countries},
-            'weights': {country_name: f'{weights[country_name]:,.2%}' for country_name in weights},
-            'actual_real_gdp_per_capita': f'${real_gdp_history[example_country][-1].real_gdp:,.2f}', 
-            'estimation': f'${alpha_star(len(real_gdp_history[example_country]) - 1):,.2f}',
-            'tax_burden_relation': f'{tax_burden_goal / get_median([instance.tax_burden for instance in data[example_country]]):,.2%}'}
+            'weights': {country_name: weights[country_name] for country_name in weights},
+            'actual_real_gdp_per_capita': float(real_gdp_history[example_country].real_gdp[-1]), 
+            'estimation': alpha_star(len(real_gdp_history[example_country]) - 1),
+            'tax_burden_relation': tax_burden_goal / example['tax_burden'].median}
+
+### EXPORTING RESULTS ###
+#  Columns of the results table. Every result of 'core' takes a row per exemplary country
+# (results without weights, a single row with just the example country and the exemplary
+# set), all of them with the same 'result' number. The exemplary set the result was
+# computed against is written as its countries' names separated by semicolons (names may
+# have commas, like 'Korea, Rep.').
+RESULT_COLUMNS = ('result', 'country', 'exemplary_set', 'estimation', 'actual_real_gdp_per_capita',
+                  'tax_burden_relation', 'exemplary_country', 'weight', 'years')
+
+# Number formats of the numeric columns in workbooks (values themselves are kept as numbers).
+NUMBER_FORMATS = {'estimation': '"$"#,##0.00', 'actual_real_gdp_per_capita': '"$"#,##0.00',
+                  'tax_burden_relation': '0.00%', 'weight': '0.00%', 'years': '0'}
+
+# Rows of the results table written at once to CSV and Parquet files.
+EXPORT_CHUNK_SIZE = 2 ** 16
+
+#  Rows of the results table (see 'RESULT_COLUMNS') from results of 'core', given as a dict
+# (example country -> result against 'exemplary_countries') or any iterable of (example
+# country, exemplary countries, result) tuples, so they can be exported as they are computed
+# (e.g. by 'parallel_regression.run_core').
+def result_rows(results: Dict[str, Dict | None] | Iterable[Tuple[str, Tuple[str], Dict | None]],
+                exemplary_countries: Tuple[str] = exemplary_countries) -> Iterator[tuple]:
+    if isinstance(results, dict):
+        results = ((example_country, exemplary_countries, core_data) for example_country, core_data in results.items())
+
+    for index, (example_country, exemplary_set, core_data) in enumerate(results):
+        exemplary_set = '; '.join(exemplary_set)
+
+        if core_data is None:
+            yield (index, example_country, exemplary_set) + (None,) * (len(RESULT_COLUMNS) - 3)
+            continue
 
-wb = Workbook()
+        for exemplary_country, years in core_data['years'].items():
+            yield (index, example_country, exemplary_set, core_data['estimation'], core_data['actual_real_gdp_per_capita'],
+                   core_data['tax_burden_relation'], exemplary_country, core_data['weights'][exemplary_country], years)
 
-ws = wb.active
+#  Write the results of 'core' (see 'result_rows') to a workbook ('.xlsx'), a CSV file or a
+# Parquet file ('.parquet'), depending on the extension of the path. Rows are streamed: the
+# workbook is write-only and CSV and Parquet files are written in chunks of 'chunk_size' rows
+# (see 'tables.write_table'), so memory stays bounded whatever the number of results.
+@timed('export.results')
+def write_results(results: Dict[str, Dict | None] | Iterable[Tuple[str, Tuple[str], Dict | None]], path: str,
+                  exemplary_countries: Tuple[str] = exemplary_countries, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+    rows = result_rows(results, exemplary_countries)
 
-for index, example_country in enumerate(example_countries):
-    core_data = core(example_country)
-    ws.cell(row=index + 3, column=1).value = example_country
-    
-    if core_data is None:
-        ws.cell(row=index + 3, column=2).value = '---'
-        continue
+    if path.endswith('.xlsx'):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
 
-    ws.cell(row=index + 3, column=2).value = core_data['estimation']
-    ws.cell(row=index + 3, column=3).value = core_data['actual_real_gdp_per_capita']
-    ws.cell(row=index + 3, column=4).value = core_data['tax_burden_relation']
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(RESULT_COLUMNS)
 
-    for i, exemplary_country in zip(range(0, len(core_data['years']) * 2, 2), core_data['years'].keys()):
-        ws.cell(row=1, column=5 + i).value = exemplary_country
-        ws.cell(row=1, column=6 + i).value = exemplary_country
-        
-        ws.cell(row=index + 3, column=5 + i).value = core_data['weights'][exemplary_country]
-        ws.cell(row=index + 3, column=6 + i).value = core_data['years'][exemplary_country]
+        #  A styled cell per formatted column, whose value is replaced on every row (rows
+        # are written as soon as they are appended).
+        styled = {}
+        for column in NUMBER_FORMATS:
+            styled[RESULT_COLUMNS.index(column)] = cell = WriteOnlyCell(ws)
+            cell.number_format = NUMBER_FORMATS[column]
+
+        for row in rows:
+            row = list(row)
+            for position, cell in styled.items():
+                if row[position] is not None:
+                    cell.value = row[position]
+                    row[position] = cell
+
+            ws.append(row)
+
+        wb.save(path)
+        return
+
+    import pandas as pd
+    from tables import write_table
 
+    #  Every chunk gets the same types, whether or not it has results without weights
+    # (whose numbers are missing).
+    dtypes = {'result': 'int64', 'country': 'string', 'exemplary_set': 'string', 'exemplary_country': 'string',
+              'years': 'Int64'}
+
+    def frames() -> Iterator[pd.DataFrame]:
+        while chunk := list(islice(rows, chunk_size)):
+            frame = pd.DataFrame.from_records(chunk, columns=RESULT_COLUMNS)
+            yield frame.astype({column: dtypes.get(column, 'float64') for column in RESULT_COLUMNS})
+
+    write_table(frames(), path)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Estimate the real GDP per capita of the example countries.')
+    parser.add_argument('--output', help='workbook (.xlsx), CSV or Parquet (.parquet) file to write the results to')
+    arguments = parser.parse_args()
+
+    load_data()
+
+    results = {example_country: core(example_country) for example_country in example_countries}
+
+    if arguments.output:
+        write_results(results, arguments.output)
+    else:
+        for example_country, core_data in results.items():
+            print(example_country, ':', '---' if core_data is None else f"${core_data['estimation']:,.2f}")
 
-#wb.save('table_y.2.1.xlsx')
\ No newline at end of file
+    emit()
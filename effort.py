@@ -0,0 +1,34 @@
+from __future__ import annotations
+from math import sqrt
+
+#  The golden number is not included in the math library, so
+# we calculate and hold it in a variable.
+PHI = (1 + sqrt(5)) / 2
+
+#  Tax effort formula used on the paper. It works both with plain numbers and
+# with NumPy arrays, in which case every argument is broadcast against the others.
+def tax_effort(tax_burden, unemployment, gdp_ppp, exponent: float = PHI):
+    #  Plain numbers are computed without NumPy, so single queries do not need to load it
+    # (unless they overflow or divide by zero, which NumPy turns into infinities).
+    if all(isinstance(value, (int, float)) for value in (tax_burden, unemployment, gdp_ppp, exponent)):
+        try:
+            return tax_burden / ((1 - tax_burden) * (1 - unemployment) * (float(gdp_ppp) ** exponent))
+        except (OverflowError, ZeroDivisionError):
+            pass
+
+    import numpy as np
+
+    return tax_burden / ((1 - tax_burden) * (1 - unemployment) * (np.asarray(gdp_ppp, dtype=float) ** exponent))
+
+#  Natural logarithm of the tax effort. Big exponents make 'gdp_ppp ** exponent'
+# overflow, while its logarithm is just 'exponent * log(gdp_ppp)', so sweeps over
+# wide exponent ranges are done in logarithmic space.
+def log_tax_effort(tax_burden, unemployment, gdp_ppp, exponent=PHI):
+    import numpy as np
+
+    tax_burden = np.asarray(tax_burden, dtype=float)
+    unemployment = np.asarray(unemployment, dtype=float)
+
+    base = np.log(tax_burden) - np.log1p(-tax_burden) - np.log1p(-unemployment)
+
+    return base - np.multiply.outer(exponent, np.log(gdp_ppp)) if np.ndim(exponent) else base - exponent * np.log(gdp_ppp)
@@ -1,89 +1,76 @@
 # Import needed libraries.
-from math import sqrt
+from __future__ import annotations
+from argparse import ArgumentParser
+from typing import Dict, Iterable
 
-import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 
-# Declare golden number.
-PHI = (1 + sqrt(5)) / 2
+from correlations_search_engine import load_data
+from effort import PHI, tax_effort
 
-# Tax effort formula.
-tax_effort = lambda tax_burden, unemployment, gdp_ppp: b / ((1 - tax_burden) * (1 - unemployment) * (gdp_ppp ** PHI))
+#  Tax burden multipliers tried on the chosen country by default: from 0.1 to 2,
+# in steps of 0.1, leaving out 1 (its actual tax burden).
+MULTIPLIERS = [i / 10 for i in range(1, 21) if i != 10]
 
-#  Use preprocessed data with columns:
-# country, gdp_per_capita_ppp, tax_burden, hdi, unemployment
-df = pd.read_csv('datasets/data.csv')
+#  Counterfactual tax efforts of every country in 'data' (as loaded by 'correlations_search_engine.load_data')
+# if its tax burden were multiplied by each of the given multipliers, keeping everything else the same.
+# Returns a (countries, multipliers) matrix. Tax burdens of 100% or more have no tax effort (NaN).
+def counterfactual_efforts(multipliers: Iterable[float], data: Dict[str, np.ndarray] = None,
+                           exponent: float = PHI) -> np.ndarray:
+    data = load_data() if data is None else data
+    multipliers = np.fromiter((float(multiplier) for multiplier in multipliers), dtype=float)
 
-df = df.set_index('country', drop=False)
+    tax_burdens = np.multiply.outer(data['tax_burden'], multipliers)
+    efforts = tax_effort(tax_burdens, data['unemployment'][:, np.newaxis], data['gdp_ppp'][:, np.newaxis], exponent)
 
-# Choose country (in this case, Spain).
-country = 'Spain'
-country_data = df.loc[country]
+    return np.where((tax_burdens >= 0) & (tax_burdens < 1), efforts, np.nan)
 
-#  Build additional instances for the specified country with different tax burdens. 
-# keeping all other information the same.
-addons = []
-for index, multiplier in enumerate([i / 10 for i in range(1, 21) if i != 10]):
-    if index + 1 >= 10:
-        index += 1
 
-    sub_df = pd.DataFrame(
-        {
-            'country': [f'{country} x{(index + 1) / 10}'],
-            'gdp_per_capita_ppp': [country_data['gdp_per_capita_ppp']],
-            'tax_burden': [country_data['tax_burden'] * multiplier],
-            'hdi': [country_data['hdi']],
-            'unemployment': [country_data['unemployment']]
-        }
-    )
-    
-    addons.append(sub_df)
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Plot the tax efforts of a country if its tax burden were multiplied.')
+    parser.add_argument('--country', default='Spain', help="name of the country, as in 'datasets/data.csv'")
+    arguments = parser.parse_args()
 
-df = pd.concat((df, *addons), ignore_index=False, axis=0)
+    import matplotlib.pyplot as plt
 
-# Removing top 5 tax efforts.
-df = df.drop(['Cambodia', 'India', 'Brazil', 'South Africa', 'Bangladesh'])
+    #  Use preprocessed data with columns:
+    # country, gdp_per_capita_ppp, tax_burden, hdi, unemployment
+    data = load_data()
 
-# Get country's tax effort.
-countries_data = []
-for country_data in df.to_dict('records'):
-    b = country_data['tax_burden'] / 100
-    u = country_data['unemployment'] / 100
-    p = country_data['gdp_per_capita_ppp']
+    # Choose country (Spain by default).
+    country = arguments.country
+    if country not in data['country']:
+        parser.error(f"unknown country {country!r}: it must be one of the countries in 'datasets/data.csv'")
 
-    countries_data.append([country_data['country'], tax_effort(b, u, p), country_data['tax_burden']])
+    code = int(np.flatnonzero(data['country'] == country)[0])
 
+    # Every country's actual tax effort, along with Spain's with different tax burdens.
+    efforts = counterfactual_efforts([1, *MULTIPLIERS], data)
 
-# Format and plot tax burden-tax effort data.
-df = pd.DataFrame(countries_data, columns=['country', 'tax_effort', 'tax burden'])
+    # Removing top 5 tax efforts.
+    shown = ~np.isin(data['country'], ['Cambodia', 'India', 'Brazil', 'South Africa', 'Bangladesh', country])
 
-experiment_names = [data[0] for data in countries_data if country in data[0] and country != data[0]]
+    # Format and plot tax burden-tax effort data (tax burdens as percentages).
+    x, y = 100 * data['tax_burden'][shown], efforts[shown, 0]
+    x2, y2 = 100 * data['tax_burden'][code] * np.array(MULTIPLIERS), efforts[code, 1:]
+    x3, y3 = 100 * data['tax_burden'][code], efforts[code, 0]
 
-x = [data[2] for data in countries_data if country not in data[0]]
-y = [data[1] for data in countries_data if country not in data[0]]
+    plt.scatter(x, y, color='lightblue')
+    plt.scatter(x2, y2, color='darkblue')
+    plt.scatter([x3], [y3], color='darkgrey')
 
-x2 = [data[2] for data in countries_data if country in data[0] and country != data[0]]
-y2 = [data[1] for data in countries_data if country in data[0] and country != data[0]]
+    plt.xlabel('Tax Burden')
+    plt.ylabel('Tax Effort')
 
-x3 = [data[2] for data in countries_data if country == data[0]]
-y3 = [data[1] for data in countries_data if country == data[0]]
 
-plt.scatter(x, y, color='lightblue')
-plt.scatter(x2, y2, color='darkblue')
-plt.scatter(x3, y3, color='darkgrey')
+    # Write country's name attached to its points.
+    ax = plt.gca()
+    for multiplier, x_value, y_value in zip(MULTIPLIERS, x2, y2):
+        ax.annotate(f' x{multiplier}', (x_value, y_value))
 
-plt.xlabel('Tax Burden')
-plt.ylabel('Tax Effort')
+    ax.annotate(country, (x3, y3))
 
+    # Set a title and plot.
+    plt.title('Evolution of Tax Effort due to Tax Burden Increases')
 
-# Write country's name attached to its points.
-ax = plt.gca()    
-for i, txt in enumerate(experiment_names):
-    ax.annotate(txt.replace(country, ''), (x2[i], y2[i]))
-
-ax.annotate(country, (x3[0], y3[0]))
-
-# Set a title and plot.
-plt.title('Evolution of Tax Effort due to Tax Burden Increases')
-
-plt.show()
\ No newline at end of file
+    plt.show()
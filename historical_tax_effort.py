@@ -1,24 +1,17 @@
 # Import proper libraries.
-from typing import List, Tuple
-from math import sqrt
-from openpyxl import load_workbook
-from csv import DictReader
+from __future__ import annotations
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Tuple
+import os
+import re
 
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-import matplotlib.pyplot as plt
-
-# Define a function to find a certain element given.
-def find_element_by_year(series: List[Tuple[int, float]], year: int) -> Tuple[int, float]:
-    for element in series:
-        if element[0] == year:
-            return element[1]
-    else:
-        return None
 
-# Dictionary to hold every country's data.
-countries = {}
+from effort import tax_effort
+from instrumentation import emit, span, timed
+from panel import Panel, load_panel
+from regression import polynomial_fit, polynomial_predict
 
 # Series of countries to analyse.
 countries_to_analyse = ('Singapore', 'Ireland', 'Luxembourg', 'Canada', 'Switzerland', 'Korea, Rep.', 
@@ -30,208 +23,244 @@ countries_to_analyse = ('Singapore', 'Ireland', 'Luxembourg', 'Canada', 'Switzer
 """countries_to_analyse = ('Singapore', 'Ireland', 'Luxembourg', 'Switzerland', 'Korea, Rep.',
                             'Bangladesh', 'South Africa', 'Brazil', 'India', 'Cambodia')"""
 
+#  Years and its index (from 1950 to 2022, both included, the year 1950 would 
+# have index 1 and 2022 would have index 73).
+year_index = {year: i + 1 for i, year in enumerate(range(1950, 2022 + 1))}
+
+#  There are available three modes: 'regression', 'average' & 'median'. The first
+# one makes a linear regression if the degree is 1 and a polynomial regression
+# of that degree otherwise. The second one calculates the average of tax effort
+# values and draws a line with it through the whole chart. The third one just
+# returns the median of the data array.
+MODES = ('regression', 'average', 'median')
 
-# Set a default's dictionary structure inside 'countries' to save pertinent data.
-for country_name in countries_to_analyse:
-    countries[country_name] = {'tax_burden': [], 'unemployment': [], 'gdp_ppp': []}
+#  Tax efforts are multiplied by a constant (to avoid numbers of the sort of 6.01e-07)
+# before being plotted.
+SCALE = 10 ** 10
 
-### Tax burdens ###
-# Load tax burden data into the 'countries' dictionary.
-with open('datasets/Our_World_In_Data/OWID_Total_Tax_Revenues_GDP.csv', 'r') as file:
-    data = DictReader(file)
+# Points of every regression curve drawn on screen, whose size is not known beforehand.
+CURVE_POINTS = 10_000
 
-    for row in data:
-        country_name = row['Entity']
-        country_name = country_name.replace('South Korea', 'Korea, Rep.')
+#  Tax effort of every country of the panel in every year from 'first_year' to 'last_year'
+# (both included), computed at once over the year-aligned arrays of the panel. Returns
+# the years and a (countries, years) matrix whose rows follow 'panel.countries'; years
+# where any of the variables is missing are NaN.
+@timed('compute.tax_effort')
+def tax_effort_matrix(panel: Panel, first_year: int = 1950, last_year: int = 2022) -> Tuple[np.ndarray, np.ndarray]:
+    years = np.arange(first_year, last_year + 1)
 
-        if country_name in countries_to_analyse:
-            countries[country_name]['tax_burden'].append((
-                int(row['Year']),
-                float(row[r'Total tax revenue (% of GDP) (ICTD (2021))']) / 100
-            ))
+    #  Columns of the panel for each year. Years out of the panel's range point to an
+    # extra column full of NaN.
+    offsets = years - panel.first_year
+    inside = (offsets >= 0) & (offsets < len(panel.years))
+    offsets = np.where(inside, offsets, len(panel.years))
 
-### Unemployment rates ###
-# Load unemployment rates data into the 'countries' dictionary.
-wb = load_workbook('datasets/World_Bank/WB_Unemployment.xlsx')
+    def aligned(indicator: str) -> np.ndarray:
+        values = np.concatenate((panel[indicator], np.full((len(panel.countries), 1), np.nan)), axis=1)
 
-ws = wb.active
+        return values[:, offsets]
 
-for row in range(1, ws.max_row + 1):
-    country_name = ws.cell(row=row, column=1).value
-    
-    if country_name not in countries_to_analyse:
-        continue
+    return years, tax_effort(aligned('tax_burden'), aligned('unemployment'), aligned('gdp_ppp'))
 
-    last_year = None
-    column = 4
-    while last_year != 2021:
-        column += 1
-        
-        last_year = int(ws.cell(row=1, column=column).value)
+# Title of the charts of a mode.
+def chart_title(mode: str, degree: int = 1) -> str:
+    if mode == 'regression':
+        return 'Linear Regression of Tax Efforts' if degree == 1 else f'Polynomial Regression of Degree {degree} of Tax Efforts'
 
-        value = ws.cell(row=row, column=column).value
-        try:
-            countries[country_name]['unemployment'].append((
-                last_year,
-                float(value) / 100
-            ))
-        except Exception:
-            continue
+    return 'Average of Tax Efforts' if mode == 'average' else 'Median of Tax Efforts'
 
-wb.close()
+#  Fit every country's (scaled) tax efforts against the years' indexes at once. Returns
+# a (countries, degree + 1) array of coefficients.
+def fit_regressions(efforts: np.ndarray, degree: int = 1) -> np.ndarray:
+    with span('regression.tax_effort'):
+        return polynomial_fit(np.array(list(year_index.values())), SCALE * efforts, degree)
 
-### GDPs Per Capita (PPP) ###
-# Load GDPs per capita (PPP) data into the 'countries' dictionary.
-wb = load_workbook('datasets/International_Monetary_Fund/IMF_GDP_Per_Capita_PPP.xlsx')
+#  Plot the tax efforts (one row per country, for every year in 'year_index') of the given
+# countries on a Matplotlib axes, along with the line of the mode: for regressions, their
+# curves (with 'curve_points' points) given their coefficients. Returns the result of every
+# country: its average predicted tax effort, its average or its median.
+def draw_chart(ax, mode: str, countries: Iterable[str], efforts: np.ndarray, coefficients: np.ndarray = None,
+               curve_points: int = CURVE_POINTS) -> Dict[str, float]:
+    results = {}
+    for country_name, country_efforts, country_coefficients in zip(
+        countries, efforts, coefficients if coefficients is not None else [None] * len(efforts)
+    ):
+        #  Tax efforts of the country, leaving blank the years where any of the needed
+        # variables is missing.
+        available = ~np.isnan(country_efforts)
 
-ws = wb.active
+        # X-axis values are the years' indexes and Y-axis values the scaled tax efforts.
+        x = [index for index, is_available in zip(year_index.values(), available.tolist()) if is_available]
+        y = (SCALE * country_efforts[available]).tolist()
 
-for row in range(1, ws.max_row + 1):
-    
-    country_name = ws.cell(row=row, column=1).value
-    
-    if isinstance(country_name, str):
-        country_name = country_name.replace('Korea, Republic of', 'Korea, Rep.')
+        #  Plot dots: X-axis is year's index and Y-axis is its tax effort then.
+        ax.scatter(x, y, label=country_name)
 
-    if country_name not in countries_to_analyse:
-        continue
+        # Regression case.
+        if mode == 'regression':
+            x_line = np.linspace(0, len(year_index), curve_points)
+            y_line = polynomial_predict(country_coefficients, x_line)[0]
 
-    last_year = None
-    column = 1
-    while last_year != 2021:
-        column += 1
+            ax.plot(x_line, y_line, label=f'Regression of {country_name}')
 
-        last_year = int(ws.cell(row=1, column=column).value)
+            expected_tax_effort = polynomial_predict(country_coefficients, np.arange(len(year_index)))[0]
 
-        value = ws.cell(row=row, column=column).value
-        try:
-            countries[country_name]['gdp_ppp'].append((last_year, float(value)))
-        except Exception:
-            continue
+            results[country_name] = sum(expected_tax_effort) / len(expected_tax_effort)
 
-wb.close()
+        # Average case.
+        if mode == 'average':
+            average = sum(y) / len(y)
 
-### Building Missing Values ###
-#  Define a constant PHI with the golden number and a lambda function to calculate
-# the tax effort with the formula used on the paper.
-PHI = (1 + sqrt(5)) / 2 
-tax_effort = lambda tax_burden, unemployment, gdp_ppp: tax_burden / ((1 - tax_burden) * (1 - unemployment) * (gdp_ppp ** PHI))
+            ax.plot([0, len(year_index)], [average] * 2, label=f'Average of {country_name}')
 
+            results[country_name] = average
 
-### PLOT ###
-#  Years and its index (from 1950 to 2022, both included, the year 1950 would 
-# have index 1 and 2022 would have index 73).
-year_index = {year: i + 1 for i, year in enumerate(range(1950, 2022 + 1))}
+        # Median case.
+        if mode == 'median':
+            ordered_datapoints = sorted(y)
 
-#  There are available two modes: 'regression', 'average' & 'median'. The first
-# one makes a linear regression if REG_DEGREE is 1 and a polynomial regression
-# of degree REG_DEGREE otherwise. The second one calculates the average of
-# tax effort values and draws a line with it through the whole chart. The third
-# one just returns the median of the data array.
-mode = 'median'
+            if len(ordered_datapoints) % 2 == 1:
+                median = ordered_datapoints[len(ordered_datapoints) // 2]
+            else:
+                median = (ordered_datapoints[len(ordered_datapoints) // 2 - 1] + ordered_datapoints[len(ordered_datapoints) // 2]) / 2
 
-#  Degree of the linear/polynomial regression to make. Must be an integer
-# greater than zero.
-REG_DEGREE = 1
+            ax.plot([0, len(year_index)], [median] * 2, label=f'Median of {country_name}')
 
-# Regression case.
-if mode == 'regression':
-    plt.title('Linear Regression of Tax Efforts' if REG_DEGREE == 1 
-                    else f'Polynomial Regression of Degree {REG_DEGREE} of Tax Efforts')
+            results[country_name] = median
 
-    print(f'Average Regression (Degree {REG_DEGREE}) Results:')
+    # Style plotted figure.
+    ax.set_xlabel('Year (as index)')
+    ax.set_ylabel('Tax Effort ')
 
-# Average case.
-elif mode == 'average':
-    plt.title('Average of Tax Efforts')
+    ax.legend()
 
-    print('Average Value Results:')
+    return results
 
-# Median case.
-elif mode == 'median':
-    plt.title('Median of Tax Efforts')
+### HEADLESS RENDERING ###
+#  Every worker receives, once, the countries, their tax efforts and their regressions
+# of every degree; tasks then only carry which chart to draw and where to save it.
+_chart_data: Tuple[List[str], np.ndarray, Dict[int, np.ndarray]] = None
 
-    print('Median Values Results:')
+def _initialize(countries: List[str], efforts: np.ndarray, regressions: Dict[int, np.ndarray]) -> None:
+    global _chart_data
 
+    _chart_data = countries, efforts, regressions
 
-# Load and plot data from every country listed in 'countries_to_analyse'.
-for country_name in countries:
-    x = []
-    y = []
+def _render(task: Tuple[str, int, List[int], str, Tuple[float, float], int]) -> str:
+    # Figures are built without pyplot, so no (interactive) backend is ever loaded.
+    from matplotlib.figure import Figure
 
-    for year in year_index:
-        #  Look for every element (tuple of two values, the year and country's tax effort at the time) 
-        # through the function defined earlier.
-        tax_burden = find_element_by_year(countries[country_name]['tax_burden'], year)
-        unemployment = find_element_by_year(countries[country_name]['unemployment'], year)
-        gdp_ppp = find_element_by_year(countries[country_name]['gdp_ppp'], year)
+    mode, degree, rows, path, size, dpi = task
+    countries, efforts, regressions = _chart_data
 
-        # If any of the needed variables are missing (is None), then skip and leave blank.
-        if None in {tax_burden, unemployment, gdp_ppp}:
-            continue
+    figure = Figure(figsize=size, dpi=dpi)
+    ax = figure.add_subplot()
+    ax.set_title(chart_title(mode, degree))
 
-        #  Otherwise, append to the X-axis list of values the year's index and to the Y-axis
-        # list of value the tax effort multiplied by a constant (to avoid numbers of the 
-        # sort of 6.01e-07).
-        x.append(year_index[year])
-        y.append((10 ** 10) * tax_effort(tax_burden, unemployment, gdp_ppp))
+    # Curves have a point per horizontal pixel of the axes, more would not be seen.
+    curve_points = max(2, int(np.ceil(ax.get_position().width * size[0] * dpi)))
 
-    #  Plot dots: X-axis is year's index and Y-axis is its tax effort then.
-    plt.scatter(x, y, label=country_name)
+    draw_chart(ax, mode, [countries[row] for row in rows], efforts[rows],
+               regressions[degree][rows] if mode == 'regression' else None, curve_points)
 
-    # Regression case.
-    if mode == 'regression':
-        X = np.array(x).reshape(-1, 1)
-        Y = np.array(y)
-        
-        X_poly = PolynomialFeatures(degree=REG_DEGREE).fit_transform(X)
-        model = LinearRegression()
-        model.fit(X_poly, Y)
+    figure.savefig(path)
 
-        x_line = np.linspace(0, len(year_index), 10_000).reshape(-1, 1)
-        y_line = model.predict(PolynomialFeatures(degree=REG_DEGREE).fit_transform(x_line))
-        
-        plt.plot(x_line, y_line, label=f'Regression of {country_name}')
+    return path
 
-        expected_tax_effort = model.predict(PolynomialFeatures(degree=REG_DEGREE)
-                                    .fit_transform(np.arange(len(year_index)).reshape(-1, 1)))
+#  Name of the file of a chart: its title, with anything that is not a letter or a digit
+# replaced by underscores.
+def _file_name(title: str, image_format: str) -> str:
+    return f'{re.sub(r"[^0-9A-Za-z]+", "_", title).strip("_")}.{image_format}'
 
-        average_predicted_tax_effort = sum(expected_tax_effort) / len(expected_tax_effort)
+#  Render, without any display, a chart per country (every country with a tax effort by
+# default) and a combined one (by default, with 'countries_to_analyse') for every mode and,
+# for regressions, every degree. Charts are saved in 'directory', within a folder per
+# mode ('regression_<degree>' for regressions), and drawn on a pool of processes.
+# Returns the paths of every image.
+@timed('plot.render')
+def render_charts(directory: str, panel: Panel = None, countries: Iterable[str] = None,
+                  combined: Iterable[str] = countries_to_analyse, modes: Iterable[str] = MODES,
+                  degrees: Iterable[int] = (1,), size: Tuple[float, float] = (12.8, 7.2), dpi: int = 100,
+                  image_format: str = 'png', processes: int = None) -> List[str]:
+    if panel is None:
+        panel = load_panel(('tax_burden', 'unemployment', 'gdp_ppp'))
 
-        print(f'  - {country_name}: {average_predicted_tax_effort}')
-    
+    _, efforts = tax_effort_matrix(panel, min(year_index), max(year_index))
 
-    # Average case.
-    if mode == 'average':
-        average = sum(y) / len(y)
-        
-        x_line = [0, len(year_index)]
-        y_line = [average] * 2
+    if countries is None:
+        countries = [country_name for code, country_name in enumerate(panel.countries) if not np.isnan(efforts[code]).all()]
+    countries, combined = list(countries), list(combined)
+
+    # Only the rows of the countries charted are sent to the workers.
+    charted = list(dict.fromkeys(countries + combined))
+    efforts = efforts[[panel.code(country_name) for country_name in charted]]
+    rows = {country_name: row for row, country_name in enumerate(charted)}
+
+    modes, degrees = list(modes), list(degrees)
+    regressions = {degree: fit_regressions(efforts, degree) for degree in degrees} if 'regression' in modes else {}
+
+    tasks = []
+    for mode in modes:
+        for degree in (degrees if mode == 'regression' else [1]):
+            folder = os.path.join(directory, f'regression_{degree}' if mode == 'regression' else mode)
+            os.makedirs(folder, exist_ok=True)
+
+            tasks.append((mode, degree, [rows[country_name] for country_name in combined],
+                          os.path.join(folder, _file_name('combined', image_format)), size, dpi))
+            tasks.extend(
+                (mode, degree, [rows[country_name]], os.path.join(folder, _file_name(country_name, image_format)), size, dpi)
+                for country_name in countries
+            )
+
+    with Pool(processes, initializer=_initialize, initargs=(charted, efforts, regressions)) as pool:
+        return pool.map(_render, tasks, chunksize=max(1, len(tasks) // (4 * (processes or os.cpu_count() or 1))))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Plot the tax efforts of every year of the countries to analyse.')
+    parser.add_argument('--mode', choices=MODES, default='median')
+    parser.add_argument('--degree', type=int, default=1, help='degree of the regression (an integer greater than zero)')
+    parser.add_argument('--render', metavar='DIRECTORY',
+                        help='save charts of every country, mode and degree to a directory instead of showing one')
+    parser.add_argument('--degrees', type=int, nargs='+', default=[1, 2, 3], help='degrees of the rendered regressions')
+    parser.add_argument('--format', default='png', help='format of the rendered images (png, svg, pdf...)')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--processes', type=int)
+    arguments = parser.parse_args()
+
+    # Load tax burdens, unemployment rates and GDPs per capita (PPP) of every country.
+    panel = load_panel(('tax_burden', 'unemployment', 'gdp_ppp'))
+
+    if arguments.render:
+        paths = render_charts(arguments.render, panel, degrees=arguments.degrees, dpi=arguments.dpi,
+                              image_format=arguments.format, processes=arguments.processes)
+        print(f'{len(paths):,} charts saved in {arguments.render}')
+
+        emit()
+    else:
+        import matplotlib.pyplot as plt
 
-        plt.plot(x_line, y_line, label=f'Average of {country_name}')
+        # Tax efforts of every country and year.
+        years, efforts = tax_effort_matrix(panel, min(year_index), max(year_index))
+        efforts = efforts[[panel.code(country_name) for country_name in countries_to_analyse]]
 
-        print(f'  - {country_name}: {round(average, 2)}')
+        mode, REG_DEGREE = arguments.mode, arguments.degree
 
-    # Median case.
-    if mode == 'median':
-        ordered_datapoints = sorted(y)
+        plt.title(chart_title(mode, REG_DEGREE))
 
-        if len(ordered_datapoints) % 2 == 1:
-            median = ordered_datapoints[len(ordered_datapoints) // 2]
-        else:
-            median = (ordered_datapoints[len(ordered_datapoints) // 2 - 1] + ordered_datapoints[len(ordered_datapoints) // 2]) / 2
-        
-        x_line = [0, len(year_index)]
-        y_line = [median] * 2
+        print({'regression': f'Average Regression (Degree {REG_DEGREE}) Results:', 'average': 'Average Value Results:',
+               'median': 'Median Values Results:'}[mode])
 
-        plt.plot(x_line, y_line, label=f'Median of {country_name}')
+        regressions = fit_regressions(efforts, REG_DEGREE) if mode == 'regression' else None
 
-        print(f'  - {country_name}: {round(median, 2)}')
+        # Plot data from every country listed in 'countries_to_analyse'.
+        with span('plot'):
+            results = draw_chart(plt.gca(), mode, countries_to_analyse, efforts, regressions)
 
-# Style plotted figure and show on screen.
-plt.xlabel('Year (as index)')
-plt.ylabel('Tax Effort ')
+        for country_name, result in results.items():
+            print(f'  - {country_name}: {result if mode == "regression" else round(result, 2)}')
 
-plt.legend()
+        emit()
 
-plt.show()
\ No newline at end of file
+        # Show on screen.
+        plt.show()
@@ -0,0 +1,315 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from typing import Dict, Iterable, List, Tuple
+import json
+import os
+
+import numpy as np
+
+import double_regression
+from effort import tax_effort
+from instrumentation import emit, span, timed
+from panel import Panel, load_panel
+
+#  Incremental recomputation of the derived data of the analysis when the sources change
+# (e.g. when a new year is published). The state of the last run is kept in a file: the
+# panel it was computed from, the tax effort of every country and year, the sufficient
+# statistics of every country's real GDP trend, the summaries of every history and the
+# results of 'double_regression.core', along with the common minimums and maximums they
+# come from. On refresh, the new panel is compared cell by cell with the kept one and only
+# what depends on the cells that changed is computed again.
+
+INDICATORS = ('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp')
+
+STATE_PATH = 'incremental_state.npz'
+
+#  Sufficient statistics of the least squares line of every country's real GDP per capita
+# against the years passed since the state's origin: number of points and sums of the
+# years, of the values, of the squared years and of the years times the values. Points are
+# added or removed by adding or subtracting their terms, so trends are updated without
+# fitting them again.
+TREND_STATISTICS = ('count', 'years', 'values', 'squared_years', 'products')
+
+# Statistics of every summary, in the order they are kept (see 'double_regression.Summary').
+SUMMARY_STATISTICS = double_regression.Summary.__slots__
+
+# Terms of the trend statistics of every point (NaN values add nothing), along a new last axis.
+def _trend_terms(offsets: np.ndarray, values: np.ndarray) -> np.ndarray:
+    available = ~np.isnan(values)
+    offsets, values = np.where(available, offsets, 0), np.where(available, values, 0)
+
+    return np.stack((available.astype(float), offsets, values, offsets ** 2, offsets * values), axis=-1)
+
+#  Rows of 'new' (by country name) and columns (by year) in 'old', and which of them are in
+# it. Countries are matched by name rather than by registry id, as ids change whenever the
+# registry is rebuilt. Returns (rows found, their rows in 'old', columns found, their columns
+# in 'old').
+def _alignment(old: Panel, new: Panel) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    rows = [(row, old.country_codes[country_name]) for row, country_name in enumerate(new.countries)
+            if country_name in old.country_codes]
+    new_rows, old_rows = (np.array(indices, dtype=np.int64) for indices in zip(*rows)) if rows else (np.empty(0, dtype=np.int64),) * 2
+
+    columns = new.years - old.first_year
+    found = (columns >= 0) & (columns < len(old.years))
+
+    return new_rows, old_rows, np.flatnonzero(found), columns[found]
+
+#  Arrays of 'old' (with a row per country, and optionally a column per year) laid out like
+# 'new'. Countries and years missing in 'old' are NaN.
+def _reindex(array: np.ndarray, old: Panel, new: Panel, by_year: bool = True) -> np.ndarray:
+    new_rows, old_rows, new_columns, old_columns = _alignment(old, new)
+
+    if not by_year:
+        result = np.full((len(new.countries), *array.shape[1:]), np.nan)
+        result[new_rows] = array[old_rows]
+
+        return result
+
+    result = np.full((len(new.countries), len(new.years), *array.shape[2:]), np.nan)
+    result[np.ix_(new_rows, new_columns)] = array[np.ix_(old_rows, old_columns)]
+
+    return result
+
+#  Derived data of the analysis for a panel (see the top of the module), kept up to date with
+# 'refresh'. Results are computed for every country with data against every exemplary set
+# (leaving out the countries of the set), as in 'parallel_regression.run_core'.
+class DerivedState:
+    __slots__ = 'panel', 'origin', 'tax_efforts', 'trend_statistics', 'summaries', 'exemplary_sets', 'results', 'matches'
+
+    def __init__(self, panel: Panel, origin: int, tax_efforts: np.ndarray, trend_statistics: np.ndarray,
+                 summaries: np.ndarray, exemplary_sets: Iterable[Tuple[str]],
+                 results: Dict[Tuple[str, Tuple[str]], Dict | None], matches: Dict[Tuple[str, Tuple[str]], Dict]):
+        self.panel = panel
+        self.origin = origin
+
+        #  (countries, years) tax efforts, (countries, 'TREND_STATISTICS') trend statistics and
+        # (countries, 'double_regression.SUMMARY_FIELDS', 'SUMMARY_STATISTICS') summaries, with
+        # rows following 'panel.countries'. Countries without data have NaN summaries.
+        self.tax_efforts = tax_efforts
+        self.trend_statistics = trend_statistics
+        self.summaries = summaries
+
+        self.exemplary_sets = [tuple(exemplary_countries) for exemplary_countries in exemplary_sets]
+
+        #  Result of every (example country, exemplary countries) pair, and the years of the common
+        # minimum and maximum of the example country with every exemplary one, as (exemplary
+        # country's minimum, example country's minimum, exemplary country's maximum, example
+        # country's maximum).
+        self.results = results
+        self.matches = matches
+
+    # State without any data, so its first refresh computes everything.
+    @classmethod
+    def empty(cls, exemplary_sets: Iterable[Tuple[str]] = (double_regression.exemplary_countries,)) -> DerivedState:
+        panel = Panel([], 0, {indicator: np.empty((0, 0)) for indicator in INDICATORS}, np.empty(0, dtype=np.int64))
+
+        return cls(panel, None, np.empty((0, 0)), np.empty((0, len(TREND_STATISTICS))),
+                   np.empty((0, len(double_regression.SUMMARY_FIELDS), len(SUMMARY_STATISTICS))), exemplary_sets, {}, {})
+
+    #  Real GDP trend, as (intercept, slope), of every given country: a line against the years
+    # passed since its first real GDP, as in 'double_regression.load_data'. Countries with less
+    # than two real GDPs get NaN.
+    def trends(self, countries: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+        countries = list(countries)
+        codes = [self.panel.code(country_name) for country_name in countries]
+
+        count, years, values, squared_years, products = self.trend_statistics[codes].T
+        first_offsets = self.panel.years[np.argmax(self.panel.mask('real_gdp')[codes], axis=1)] - self.origin
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            slopes = (count * products - years * values) / (count * squared_years - years ** 2)
+            intercepts = (values - slopes * years) / count + slopes * first_offsets
+
+        return {country_name: (intercept, slope) for country_name, intercept, slope
+                in zip(countries, intercepts.tolist(), slopes.tolist())}
+
+    #  Bring the state up to date with a panel of 'INDICATORS' (loaded from 'datasets/' by default).
+    # Only the tax efforts of the cells that changed are computed again, trends are updated by
+    # adding the new points' terms and removing the old ones' and summaries and results are only
+    # computed again for the countries with changes (results, when any of their countries has).
+    # 'double_regression' is left loaded with just the countries those results needed.
+    # Returns what changed: number of cells of every indicator, countries and results computed.
+    @timed('compute.refresh')
+    def refresh(self, panel: Panel = None) -> Dict:
+        if panel is None:
+            panel = load_panel(INDICATORS)
+
+        #  Countries with data (the ones 'double_regression.load_data' keeps), which every
+        # exemplary country must be. The state is left untouched otherwise.
+        examples = [panel.countries[row] for row in np.flatnonzero(panel.complete(*INDICATORS).any(axis=1)).tolist()]
+        double_regression.check_exemplary_sets(self.exemplary_sets, examples)
+
+        old, self.panel = self.panel, panel
+        self.origin = panel.first_year if self.origin is None else self.origin
+
+        with span('refresh.changes'):
+            #  Values of the old panel laid out like the new one and the cells of every indicator
+            # that changed. Tax efforts change wherever any of their variables does.
+            previous, differences = {}, {}
+            for indicator in INDICATORS:
+                previous[indicator] = _reindex(old[indicator], old, panel)
+                differences[indicator] = (previous[indicator] != panel[indicator]) & ~(np.isnan(previous[indicator])
+                                                                                    & np.isnan(panel[indicator]))
+
+            cells = {indicator: int(difference.sum()) for indicator, difference in differences.items()}
+            effort_changes = differences['tax_burden'] | differences['unemployment'] | differences['gdp_ppp']
+
+            #  Countries gone from the panel, and countries whose data out of the years of the new
+            # panel is gone (whose trend statistics are computed again from scratch).
+            new_rows, old_rows, _, old_columns = _alignment(old, panel)
+            removed = sorted(set(old.countries) - set(panel.countries))
+            outside = np.ones(len(old.years), dtype=bool)
+            outside[old_columns] = False
+            lost = np.zeros(len(panel.countries), dtype=bool)
+            for indicator in INDICATORS:
+                lost[new_rows] |= (~np.isnan(old[indicator][old_rows][:, outside])).any(axis=1)
+
+            changed_rows = np.flatnonzero(
+                np.logical_or.reduce([difference.any(axis=1) for difference in differences.values()]) | lost
+            )
+            changed_countries = [panel.countries[row] for row in changed_rows.tolist()]
+
+        with span('refresh.tax_effort'):
+            self.tax_efforts = _reindex(self.tax_efforts, old, panel)
+
+            rows, columns = np.nonzero(effort_changes)
+            self.tax_efforts[rows, columns] = tax_effort(panel['tax_burden'][rows, columns], panel['unemployment'][rows, columns],
+                                                         panel['gdp_ppp'][rows, columns])
+
+        with span('refresh.trends'):
+            self.trend_statistics = _reindex(self.trend_statistics, old, panel, by_year=False)
+            self.trend_statistics[np.isnan(self.trend_statistics[:, 0])] = 0
+
+            rows, columns = np.nonzero(differences['real_gdp'] & ~lost[:, np.newaxis])
+            offsets = (panel.years[columns] - self.origin).astype(float)
+            np.add.at(self.trend_statistics, rows, _trend_terms(offsets, panel['real_gdp'][rows, columns])
+                                                   - _trend_terms(offsets, previous['real_gdp'][rows, columns]))
+
+            rows = np.flatnonzero(lost)
+            self.trend_statistics[rows] = _trend_terms((panel.years - self.origin).astype(float)[np.newaxis, :],
+                                                       panel['real_gdp'][rows]).sum(axis=1)
+
+        #  Results whose example country or any exemplary country changed (or that are new),
+        # leaving out the ones of countries without data anymore.
+        affected_countries = set(changed_countries) | set(removed)
+
+        pairs = [(example_country, exemplary_countries) for exemplary_countries in self.exemplary_sets
+                 for example_country in examples if example_country not in exemplary_countries]
+        affected = [pair for pair in pairs if pair not in self.results or pair[0] in affected_countries
+                    or affected_countries.intersection(pair[1])]
+
+        self.results = {pair: self.results[pair] for pair in pairs if pair in self.results}
+        self.matches = {pair: self.matches[pair] for pair in pairs if pair in self.matches}
+
+        with span('refresh.summaries'):
+            self.summaries = _reindex(self.summaries, old, panel, by_year=False)
+
+            #  'double_regression' is loaded with just the countries of the results to compute
+            # (and the ones whose summaries changed), along with their up-to-date trends.
+            needed = set(changed_countries).union(*(pair[1] for pair in affected), (pair[0] for pair in affected))
+            needed = [country_name for country_name in panel.countries if country_name in needed]
+            double_regression.load_data(panel.select(needed), self.trends(needed))
+
+            for country_name in changed_countries:
+                summaries = double_regression.summaries.get(country_name)
+                self.summaries[panel.code(country_name)] = np.nan if summaries is None else [
+                    [getattr(summaries[field], statistic) for statistic in SUMMARY_STATISTICS]
+                    for field in double_regression.SUMMARY_FIELDS
+                ]
+
+        with span('refresh.results'):
+            for pair in affected:
+                try:
+                    self.results[pair] = double_regression.core(*pair)
+                except ZeroDivisionError:
+                    # Degenerate histories, as in 'parallel_regression'.
+                    self.results[pair] = None
+
+            self._match(affected)
+
+            # Results are kept in the same order a full computation would give.
+            self.results = {pair: self.results[pair] for pair in pairs}
+            self.matches = {pair: self.matches[pair] for pair in pairs}
+
+        return {'cells': cells, 'countries': changed_countries, 'removed': removed, 'results': len(affected)}
+
+    # Compute the common minimums and maximums of the given results' countries at once.
+    def _match(self, pairs: List[Tuple[str, Tuple[str]]]) -> None:
+        index = double_regression.real_gdp_index
+
+        matched = [(pair, exemplary_country) for pair in pairs for exemplary_country in pair[1]
+                   if pair[0] in index.codes and exemplary_country in index.codes]
+        exemplary_codes = np.array([index.codes[exemplary_country] for _, exemplary_country in matched], dtype=np.int64)
+        example_codes = np.array([index.codes[pair[0]] for pair, _ in matched], dtype=np.int64)
+
+        positions = index.common_positions(exemplary_codes, example_codes)
+        years = np.stack([index.year(codes, country_positions) for codes, country_positions
+                          in zip((exemplary_codes, example_codes) * 2, positions)], axis=-1) if matched else np.empty((0, 4))
+
+        for pair in pairs:
+            self.matches[pair] = {}
+        for (pair, exemplary_country), pair_years in zip(matched, years.tolist()):
+            self.matches[pair][exemplary_country] = tuple(pair_years)
+
+    #  Save the state to a binary (.npz) file. It is written to a temporary file first, so an
+    # interrupted run never leaves a broken state behind.
+    def save(self, path: str = STATE_PATH) -> None:
+        results = [[example_country, list(exemplary_countries), result, self.matches.get((example_country, exemplary_countries))]
+                   for (example_country, exemplary_countries), result in self.results.items()]
+
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            np.savez(
+                file,
+                **self.panel.to_arrays(),
+                origin=np.array(self.origin if self.origin is not None else -1),
+                tax_efforts=self.tax_efforts,
+                trend_statistics=self.trend_statistics,
+                summaries=self.summaries,
+                exemplary_sets=np.array(json.dumps(self.exemplary_sets)),
+                results=np.array(json.dumps(results)),
+            )
+
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str = STATE_PATH) -> DerivedState:
+        with np.load(path, allow_pickle=False) as file:
+            arrays = {name: file[name] for name in file.files}
+
+        results, matches = {}, {}
+        for example_country, exemplary_countries, result, pair_matches in json.loads(str(arrays['results'])):
+            pair = example_country, tuple(exemplary_countries)
+            results[pair] = result
+
+            if pair_matches is not None:
+                matches[pair] = {exemplary_country: tuple(years) for exemplary_country, years in pair_matches.items()}
+
+        origin = int(arrays['origin'])
+
+        return cls(Panel.from_arrays(arrays), None if origin < 0 else origin, arrays['tax_efforts'],
+                   arrays['trend_statistics'], arrays['summaries'],
+                   [tuple(exemplary_countries) for exemplary_countries in json.loads(str(arrays['exemplary_sets']))],
+                   results, matches)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Update the derived data of the analysis with the changes of the sources.')
+    parser.add_argument('--state', default=STATE_PATH, help='binary (.npz) file the state is kept in')
+    parser.add_argument('--rebuild', action='store_true', help='compute everything again, ignoring the kept state')
+    parser.add_argument('--output', help='workbook (.xlsx), CSV or Parquet (.parquet) file to write the results to')
+    arguments = parser.parse_args()
+
+    state = DerivedState.load(arguments.state) if os.path.exists(arguments.state) and not arguments.rebuild else DerivedState.empty()
+    changes = state.refresh()
+    state.save(arguments.state)
+
+    print(f'{sum(changes["cells"].values()):,} cells changed',
+          f'({", ".join(f"{indicator}: {cells:,}" for indicator, cells in changes["cells"].items())})',
+          f'in {len(changes["countries"]):,} countries ({len(changes["removed"]):,} removed);',
+          f'{changes["results"]:,} results computed')
+
+    if arguments.output:
+        double_regression.write_results(((*pair, result) for pair, result in state.results.items()), arguments.output)
+
+    emit()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from time import perf_counter, process_time
+from typing import Callable, Dict, Iterator, List
+import json
+import os
+import tracemalloc
+
+#  Named spans around every stage of the analysis (loading every source, joining,
+# computing, fitting regressions, exporting and plotting), recording wall time, CPU
+# time and peak memory. They are off by default and then every span is a no-op;
+# setting the environment variable TAX_EFFORT_PROFILE enables them. Its value can be
+# '1' (just print a summary at the end of a script) or the path of a JSON file where
+# the full report is written as well. Bear in mind that tracing memory (through
+# 'tracemalloc') makes enabled runs noticeably slower than normal ones.
+PROFILE_VARIABLE = 'TAX_EFFORT_PROFILE'
+
+enabled = False
+output_path = None
+
+# Finished spans, in the order they finished, and the ones currently open.
+records: List[Dict] = []
+_open_spans: List[Dict] = []
+
+_disabled_span = nullcontext()
+
+def enable(path: str = None) -> None:
+    global enabled, output_path
+
+    enabled = True
+    output_path = path
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable() -> None:
+    global enabled
+
+    enabled = False
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def reset() -> None:
+    records.clear()
+    _open_spans.clear()
+
+@contextmanager
+def _span(name: str) -> Iterator[None]:
+    #  tracemalloc only keeps one peak, so it is reset at the start of every span and
+    # the peak seen by nested spans is carried over to the one containing them. The peak
+    # reached so far by the containing span is kept before resetting it.
+    memory, peak = tracemalloc.get_traced_memory()
+    if _open_spans:
+        _open_spans[-1]['peak'] = max(_open_spans[-1]['peak'], peak)
+    tracemalloc.reset_peak()
+
+    current = {'name': name, 'parent': _open_spans[-1]['name'] if _open_spans else None,
+               'depth': len(_open_spans), 'memory': memory, 'peak': memory}
+    _open_spans.append(current)
+
+    wall, cpu = perf_counter(), process_time()
+    try:
+        yield
+    finally:
+        wall, cpu = perf_counter() - wall, process_time() - cpu
+
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, current['peak'])
+        _open_spans.pop()
+
+        if _open_spans:
+            _open_spans[-1]['peak'] = max(_open_spans[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+
+        records.append({'name': name, 'parent': current['parent'], 'depth': current['depth'],
+                        'wall_time': wall, 'cpu_time': cpu, 'peak_memory': peak - current['memory']})
+
+#  Context manager timing the code inside it under the given name. When instrumentation
+# is disabled it does nothing.
+def span(name: str):
+    return _span(name) if enabled else _disabled_span
+
+# Decorator running every call of a function inside a span.
+def timed(name: str) -> Callable[[Callable], Callable]:
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            with _span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+#  Spans aggregated by name: how many times each one ran, total wall and CPU times,
+# and the biggest peak of memory (in bytes, over the memory in use when it started).
+def summary() -> Dict[str, Dict]:
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['name'], {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'peak_memory': 0})
+        total['count'] += 1
+        total['wall_time'] += record['wall_time']
+        total['cpu_time'] += record['cpu_time']
+        total['peak_memory'] = max(total['peak_memory'], record['peak_memory'])
+
+    return totals
+
+def print_summary() -> None:
+    print(f'{"Stage":<32} {"Count":>6} {"Wall (ms)":>12} {"CPU (ms)":>12} {"Peak (MiB)":>11}')
+
+    for name, total in summary().items():
+        print(f'{name:<32} {total["count"]:>6} {total["wall_time"] * 1000:>12,.2f} '
+              f'{total["cpu_time"] * 1000:>12,.2f} {total["peak_memory"] / 1024 ** 2:>11,.2f}')
+
+def write_report(path: str) -> None:
+    with open(path, 'w') as file:
+        json.dump({'spans': records, 'summary': summary()}, file, indent=2)
+
+# Print the summary and save the report (if there is a path for it), if enabled.
+def emit() -> None:
+    if not enabled:
+        return
+
+    print_summary()
+
+    if output_path:
+        write_report(output_path)
+
+# Enable instrumentation from the environment variable.
+if os.environ.get(PROFILE_VARIABLE):
+    enable(None if os.environ[PROFILE_VARIABLE] == '1' else os.environ[PROFILE_VARIABLE])
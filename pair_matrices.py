@@ -0,0 +1,186 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import double_regression
+from instrumentation import emit, timed
+
+#  The lambdas, year intervals and weights of 'double_regression.core' for every ordered pair
+# of countries at once: rows are example countries and columns exemplary ones. Weights of
+# every example country are computed as in 'core', taking as its exemplary countries every
+# other one with a non-zero interval (the rest get NaN weights).
+
+# Pairs computed at once. Every chunk of example countries holds about this many.
+CHUNK_SIZE = 2 ** 16
+
+#  Dense (example countries, exemplary countries) matrices, plus the final lambda of every
+# example country (its lambdas weighted by its weights).
+class PairMatrices:
+    __slots__ = 'example_countries', 'exemplary_countries', 'lambdas', 'intervals', 'weights', 'final_lambdas', \
+                'example_codes', 'exemplary_codes'
+
+    def __init__(self, example_countries: List[str], exemplary_countries: List[str], lambdas: np.ndarray,
+                 intervals: np.ndarray, weights: np.ndarray, final_lambdas: np.ndarray):
+        self.example_countries = list(example_countries)
+        self.exemplary_countries = list(exemplary_countries)
+        self.lambdas = lambdas
+        self.intervals = intervals
+        self.weights = weights
+        self.final_lambdas = final_lambdas
+
+        # Row and column of every country.
+        self.example_codes = {country_name: code for code, country_name in enumerate(self.example_countries)}
+        self.exemplary_codes = {country_name: code for code, country_name in enumerate(self.exemplary_countries)}
+
+    # Lambda, year interval and weight of a pair of countries.
+    def pair(self, example_country: str, exemplary_country: str) -> Tuple[float, int, float]:
+        row, column = self.example_codes[example_country], self.exemplary_codes[exemplary_country]
+
+        return float(self.lambdas[row, column]), int(self.intervals[row, column]), float(self.weights[row, column])
+
+    #  Lambda, year interval and weight of an example country against every exemplary country
+    # with a weight.
+    def row(self, example_country: str) -> Dict[str, Tuple[float, int, float]]:
+        row = self.example_codes[example_country]
+
+        return {
+            exemplary_country: (float(self.lambdas[row, column]), int(self.intervals[row, column]), float(self.weights[row, column]))
+            for column, exemplary_country in enumerate(self.exemplary_countries)
+            if not np.isnan(self.weights[row, column])
+        }
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            example_countries=np.array(self.example_countries, dtype=str),
+            exemplary_countries=np.array(self.exemplary_countries, dtype=str),
+            lambdas=self.lambdas,
+            intervals=self.intervals,
+            weights=self.weights,
+            final_lambdas=self.final_lambdas,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> PairMatrices:
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays['example_countries'].tolist(), arrays['exemplary_countries'].tolist(), arrays['lambdas'],
+                       arrays['intervals'], arrays['weights'], arrays['final_lambdas'])
+
+#  Weights of a chunk of example countries ('rows', codes of 'double_regression.real_gdp_index')
+# against the exemplary ones ('columns'), given their intervals and which pairs are used ('valid').
+# 'medians' and 'tax_efforts' hold, for every country, its median tax burden, unemployment and
+# GDP PPP and the mean and standard deviation of its tax effort along with its median's score.
+def _weights(rows: np.ndarray, columns: np.ndarray, intervals: np.ndarray, valid: np.ndarray,
+             medians: Dict[str, np.ndarray], tax_efforts: Dict[str, np.ndarray]) -> np.ndarray:
+    PHI = double_regression.PHI
+    tax_burden, unemployment, gdp_ppp = medians['tax_burden'], medians['unemployment'], medians['gdp_ppp_per_capita']
+    counts = valid.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Tax burden goal and the score of its tax effort.
+        example_terms = tax_burden[columns] * (1 - unemployment[rows, np.newaxis]) * gdp_ppp[rows, np.newaxis] ** PHI
+        exemplary_terms = (1 - tax_burden[columns]) * (1 - unemployment[columns]) * gdp_ppp[columns] ** PHI
+        goals = np.where(valid, example_terms / (exemplary_terms + example_terms), 0).sum(axis=1) / counts
+
+        example_scores = (double_regression.tax_effort(goals, unemployment[rows], gdp_ppp[rows])
+                          - tax_efforts['mean'][rows]) / tax_efforts['std'][rows]
+
+        # Scores of the intervals' inverses, shifted by the absolute value of the lowest one.
+        inverses = np.where(valid, 1 / intervals, 0)
+        means = inverses.sum(axis=1, keepdims=True) / counts[:, np.newaxis]
+        stds = np.sqrt(np.where(valid, (inverses - means) ** 2, 0).sum(axis=1, keepdims=True) / counts[:, np.newaxis])
+        interval_scores = (inverses - means) / stds
+        interval_scores += np.abs(np.where(valid, interval_scores, np.inf).min(axis=1, keepdims=True))
+
+        distances = np.sqrt((tax_efforts['score'][columns] - example_scores[:, np.newaxis]) ** 2 + interval_scores ** 2)
+        distances = np.where(valid, distances, np.nan)
+        fractions = distances / np.nansum(distances, axis=1, keepdims=True)
+
+    #  The closest exemplary country gets the biggest fraction of the total distance, the
+    # second closest the second biggest, etc. (NaNs are sorted last).
+    order = np.argsort(distances, axis=1, kind='stable')
+    sorted_fractions = np.take_along_axis(fractions, order, axis=1)
+    reversed_positions = np.clip(counts[:, np.newaxis] - 1 - np.arange(len(columns)), 0, len(columns) - 1)
+
+    weights = np.empty_like(fractions)
+    np.put_along_axis(weights, order, np.take_along_axis(sorted_fractions, reversed_positions, axis=1), axis=1)
+
+    return np.where(valid, weights, np.nan)
+
+#  Compute the matrices for the given example and exemplary countries (every country in
+# 'double_regression.data' by default, which must be loaded first). Pairs of a country
+# with itself are left out. Example countries are processed in chunks of about
+# 'chunk_size' pairs, so memory stays bounded whatever the number of countries.
+@timed('compute.pairs')
+def pair_matrices(example_countries: List[str] = None, exemplary_countries: List[str] = None,
+                  chunk_size: int = CHUNK_SIZE) -> PairMatrices:
+    index = double_regression.real_gdp_index
+    countries = list(double_regression.data)
+
+    example_countries = countries if example_countries is None else list(example_countries)
+    exemplary_countries = countries if exemplary_countries is None else list(exemplary_countries)
+
+    examples = np.array([index.codes[country_name] for country_name in example_countries], dtype=np.int64)
+    columns = np.array([index.codes[country_name] for country_name in exemplary_countries], dtype=np.int64)
+
+    # Every country's statistics as arrays, indexed by its code.
+    summaries = [double_regression.summaries[country_name] for country_name in countries]
+    medians = {field: np.array([summary[field].median for summary in summaries])
+               for field in ('tax_burden', 'unemployment', 'gdp_ppp_per_capita')}
+    tax_efforts = {
+        'mean': np.array([summary['tax_effort'].mean for summary in summaries]),
+        'std': np.array([summary['tax_effort'].std for summary in summaries]),
+        'score': np.array([summary['tax_effort'].normalize(summary['tax_effort'].median) for summary in summaries]),
+    }
+
+    shape = (len(examples), len(columns))
+    lambdas, intervals, weights = np.empty(shape), np.empty(shape, dtype=np.int64), np.empty(shape)
+
+    rows_per_chunk = max(1, chunk_size // max(len(columns), 1))
+    for start in range(0, len(examples), rows_per_chunk):
+        rows = examples[start:start + rows_per_chunk]
+        example_codes, exemplary_codes = np.repeat(rows, len(columns)), np.tile(columns, len(rows))
+
+        exemplary_minimums, example_minimums, exemplary_maximums, example_maximums = \
+            index.common_positions(exemplary_codes, example_codes)
+
+        exemplary_differences = (index.year(exemplary_codes, exemplary_maximums)
+                                 - index.year(exemplary_codes, exemplary_minimums)).reshape(len(rows), len(columns))
+        example_differences = (index.year(example_codes, example_maximums)
+                               - index.year(example_codes, example_minimums)).reshape(len(rows), len(columns))
+
+        # As in 'core', lambdas are 0 when the exemplary country's interval is.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            chunk_lambdas = np.where(exemplary_differences != 0, example_differences / exemplary_differences, 0)
+
+        valid = (exemplary_differences != 0) & (rows[:, np.newaxis] != columns)
+
+        lambdas[start:start + len(rows)] = chunk_lambdas
+        intervals[start:start + len(rows)] = exemplary_differences
+        weights[start:start + len(rows)] = _weights(rows, columns, exemplary_differences, valid, medians, tax_efforts)
+
+    final_lambdas = np.where(np.isnan(weights), 0, lambdas * weights).sum(axis=1)
+    final_lambdas[np.isnan(weights).all(axis=1)] = np.nan
+
+    return PairMatrices(example_countries, exemplary_countries, lambdas, intervals, weights, final_lambdas)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Compute lambdas, intervals and weights for every pair of countries.')
+    parser.add_argument('--output', default='pair_matrices.npz', help='binary (.npz) file to save the matrices to')
+    parser.add_argument('--country', action='append', default=[], help='example country to print (can be repeated)')
+    arguments = parser.parse_args()
+
+    double_regression.load_data()
+    matrices = pair_matrices()
+    matrices.save(arguments.output)
+
+    for example_country in arguments.country:
+        print(f'{example_country} (final lambda {matrices.final_lambdas[matrices.example_codes[example_country]]:,.4f}):')
+
+        for exemplary_country, (pair_lambda, interval, weight) in matrices.row(example_country).items():
+            print(f'  - {exemplary_country}: lambda {pair_lambda:,.4f}, {interval} years, weight {weight:.2%}')
+
+    emit()
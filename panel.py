@@ -0,0 +1,168 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+import dataset_cache
+from instrumentation import span
+from country_registry import REGISTRY_PATH, CountryRegistry, default_registry
+from sources import PARSER_VERSION, SOURCES, Columns, Record, read_source, to_columns
+
+# Indicators the panel can hold, all of them available in 'datasets/'.
+INDICATORS = ('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp', 'hdi', 'hours')
+
+#  Country x year x indicator panel. Every indicator is a dense (countries, years) array
+# where row 'i' belongs to 'countries[i]' (whose id in the country registry is 
+# 'country_ids[i]') and column 'j' to year 'first_year + j'. Missing values are NaN.
+class Panel:
+    __slots__ = 'countries', 'country_ids', 'first_year', 'indicators', 'country_codes'
+
+    def __init__(self, countries: List[str], first_year: int, indicators: Dict[str, np.ndarray], 
+                 country_ids: np.ndarray = None):
+        self.countries = list(countries)
+        self.country_ids = np.arange(len(self.countries)) if country_ids is None else np.asarray(country_ids)
+        self.first_year = first_year
+        self.indicators = indicators
+
+        # Integer code (row) of every country.
+        self.country_codes = {country_name: code for code, country_name in enumerate(self.countries)}
+
+    @property
+    def years(self) -> np.ndarray:
+        length = next(iter(self.indicators.values())).shape[1] if self.indicators else 0
+
+        return np.arange(self.first_year, self.first_year + length)
+
+    def __getitem__(self, indicator: str) -> np.ndarray:
+        return self.indicators[indicator]
+
+    def code(self, country_name: str) -> int:
+        return self.country_codes[country_name]
+
+    def offset(self, year: int) -> int:
+        return year - self.first_year
+
+    # Boolean array telling which values of an indicator are available.
+    def mask(self, indicator: str) -> np.ndarray:
+        return ~np.isnan(self.indicators[indicator])
+
+    # Boolean array telling where all the given indicators are available at the same time.
+    def complete(self, *indicators: str) -> np.ndarray:
+        return np.logical_and.reduce([self.mask(indicator) for indicator in indicators])
+
+    def value(self, country_name: str, year: int, indicator: str) -> float:
+        return float(self.indicators[indicator][self.code(country_name), self.offset(year)])
+
+    # Years and values of a country's indicator, without missing values.
+    def series(self, country_name: str, indicator: str) -> Tuple[np.ndarray, np.ndarray]:
+        row = self.indicators[indicator][self.code(country_name)]
+        available = ~np.isnan(row)
+
+        return self.years[available], row[available]
+
+    # New panel holding only the given countries (in that order).
+    def select(self, countries: Iterable[str]) -> Panel:
+        countries = list(countries)
+        codes = [self.code(country_name) for country_name in countries]
+
+        return Panel(countries, self.first_year, {indicator: values[codes] for indicator, values in self.indicators.items()},
+                     self.country_ids[codes])
+
+    # Build a panel out of records of every indicator (see 'from_columns').
+    @classmethod
+    def from_records(cls, records: Dict[str, Iterable[Record]], registry: CountryRegistry = None) -> Panel:
+        columns = {indicator: to_columns(indicator_records) for indicator, indicator_records in records.items()}
+
+        return cls.from_columns(columns, registry)
+
+    #  Build a panel out of the columns (country ids, years and values) of every indicator.
+    # Countries are sorted by their id and years span from the earliest to the latest one
+    # found. Repeated records are overwritten by the last one read.
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Columns], registry: CountryRegistry = None) -> Panel:
+        registry = default_registry() if registry is None else registry
+
+        with span('join.panel'):
+            # Rows of the panel are found with an array lookup from the countries' ids.
+            country_ids = np.unique(np.concatenate([ids for ids, _, _ in columns.values()] or [np.empty(0, dtype=np.int64)]))
+            rows = np.zeros(len(registry), dtype=np.int64)
+            rows[country_ids] = np.arange(len(country_ids))
+
+            all_years = [years for _, years, _ in columns.values() if len(years)]
+            first_year = int(min(years.min() for years in all_years)) if all_years else 0
+            last_year = int(max(years.max() for years in all_years)) if all_years else -1
+
+            indicators = {}
+            for indicator, (ids, years, values) in columns.items():
+                array = np.full((len(country_ids), last_year - first_year + 1), np.nan)
+                array[rows[ids], years - first_year] = values
+
+                indicators[indicator] = array
+
+        return cls([registry.name(country_id) for country_id in country_ids.tolist()], first_year, indicators, country_ids)
+
+    # Plain arrays holding the whole panel, so it can be saved in a binary file.
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'countries': np.array(self.countries, dtype=str),
+            'country_ids': self.country_ids,
+            'first_year': np.array(self.first_year),
+            **{f'indicator_{indicator}': values for indicator, values in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> Panel:
+        return cls(
+            arrays['countries'].tolist(), 
+            int(arrays['first_year']),
+            {name[len('indicator_'):]: values for name, values in arrays.items() if name.startswith('indicator_')},
+            arrays['country_ids']
+        )
+
+#  Read the given indicators from their sources into a single panel. When 'use_cache' is set,
+# the columns of every indicator are cached on their own (keyed by its source file), so
+# when a single source changes, only that one is parsed again.
+def _read_panel(indicators: Tuple[str], use_cache: bool = False) -> Panel:
+    columns = {}
+    for indicator in indicators:
+        with span(f'load.{indicator}'):
+            if not use_cache:
+                columns[indicator] = read_source(indicator)
+                continue
+
+            key = dataset_cache.cache_key([REGISTRY_PATH, SOURCES[indicator][1]], PARSER_VERSION, indicator, SOURCES[indicator][2:])
+            arrays = dataset_cache.load_arrays(key)
+
+            if arrays is None:
+                arrays = dict(zip(('ids', 'years', 'values'), read_source(indicator)))
+                dataset_cache.save_arrays(key, arrays)
+
+            columns[indicator] = arrays['ids'], arrays['years'], arrays['values']
+
+    return Panel.from_columns(columns)
+
+#  Load the given indicators from their sources into a single panel. Parsed panels
+# are cached (see 'dataset_cache'), keyed by the content of the source files, so
+# they are only parsed again when a source file or the parsers change (and then,
+# only the sources that changed, see '_read_panel').
+def load_panel(indicators: Iterable[str] = INDICATORS, use_cache: bool = True) -> Panel:
+    indicators = tuple(indicators)
+
+    if not use_cache:
+        return _read_panel(indicators)
+
+    key = dataset_cache.cache_key(
+        [REGISTRY_PATH, *(SOURCES[indicator][1] for indicator in indicators)],
+        PARSER_VERSION, indicators, [SOURCES[indicator][2:] for indicator in indicators]
+    )
+
+    with span('load.cache'):
+        arrays = dataset_cache.load_arrays(key)
+
+    if arrays is not None:
+        return Panel.from_arrays(arrays)
+
+    panel = _read_panel(indicators, use_cache=True)
+    dataset_cache.save_arrays(key, panel.to_arrays())
+
+    return panel
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from argparse import ArgumentParser
+from itertools import product
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, Tuple
+
+import double_regression
+from panel import Panel, load_panel
+
+#  Every worker loads 'double_regression' once, when the pool starts, from the panel
+# given by the main process. Tasks then only carry country names, so the panel is
+# never pickled again (and with the 'fork' start method it is not pickled at all).
+def _initialize(panel: Panel) -> None:
+    double_regression.load_data(panel)
+
+def _run(task: Tuple[str, Tuple[str]]) -> Tuple[str, Tuple[str], Dict | None]:
+    example_country, exemplary_countries = task
+
+    try:
+        return example_country, exemplary_countries, double_regression.core(example_country, exemplary_countries)
+    except ZeroDivisionError:
+        #  Degenerate histories (a single year, or the same value every year) have no
+        # deviation to normalize with.
+        return example_country, exemplary_countries, None
+
+#  Run 'double_regression.core' for every example country against every set of exemplary
+# countries on a pool of processes. By default, every country with data is used as an
+# example country against 'double_regression.exemplary_countries'; countries belonging to
+# an exemplary set are not compared with it. Every country of the exemplary sets must have
+# data (ValueError otherwise), so only degenerate histories give no result. Results are
+# yielded as soon as they are ready (thus, not in order) as (example country, exemplary
+# countries, result) tuples.
+def run_core(example_countries: Iterable[str] = None,
+             exemplary_sets: Iterable[Tuple[str]] = (double_regression.exemplary_countries,),
+             panel: Panel = None, processes: int = None,
+             chunksize: int = 8) -> Iterator[Tuple[str, Tuple[str], Dict | None]]:
+    if panel is None:
+        panel = load_panel(('tax_burden', 'unemployment', 'gdp_ppp', 'real_gdp'))
+
+    exemplary_sets = [tuple(exemplary_countries) for exemplary_countries in exemplary_sets]
+
+    double_regression.load_data(panel)
+    double_regression.check_exemplary_sets(exemplary_sets)
+
+    if example_countries is None:
+        example_countries = list(double_regression.data)
+
+    tasks = [
+        (example_country, exemplary_countries)
+        for exemplary_countries, example_country in product(exemplary_sets, example_countries)
+        if example_country not in exemplary_countries
+    ]
+
+    with Pool(processes, initializer=_initialize, initargs=(panel,)) as pool:
+        yield from pool.imap_unordered(_run, tasks, chunksize)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Run 'double_regression.core' for every country on a pool of processes.")
+    parser.add_argument('--output', help='workbook (.xlsx), CSV or Parquet (.parquet) file to write the results to')
+    arguments = parser.parse_args()
+
+    # Results are written as they come (see 'double_regression.write_results').
+    if arguments.output:
+        double_regression.write_results(run_core(), arguments.output)
+    else:
+        for example_country, exemplary_countries, result in run_core():
+            print(example_country, '->', exemplary_countries, ':', result and result['estimation'])
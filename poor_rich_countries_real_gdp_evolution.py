@@ -1,60 +1,99 @@
-from csv import DictReader
-from dataclasses import dataclass
-from typing import List
-from copy import deepcopy
+from __future__ import annotations
+from argparse import ArgumentParser
 
+import numpy as np
 import pandas as pd
 
-@dataclass
-class Country:
-    name: str
-    starting_year: int
-    history: List[float]
-
-print('--- Real GDP Evolution And Average Historical Tax Effort ---')
-
-with open('datasets/Our_World_In_Data/OWID_Real_GDP_Per_Capita.csv', 'r') as file:
-    data = DictReader(file)
-
-    countries_to_analyse = ('Singapore', 'Ireland', 'Luxembourg', 'Switzerland', 'South Korea', 
-                                'Bangladesh', 'South Africa', 'Brazil', 'India', 'Cambodia')
-
-    countries_data = {country: [] for country in countries_to_analyse}
-
-    starting_years = {}
-
-    for row in data:
-        country_name = row['Entity']
-        if country_name in countries_to_analyse:
-            starting_years.setdefault(country_name, int(row['Year']))
-            countries_data[country_name].append(float(row['GDP per capita (output, multiple price benchmarks)']))
-    
-countries = [Country(country_name, starting_years[country_name], countries_data[country_name]) 
-                for country_name in countries_to_analyse]
-
-#  Tables with data. First element corresponds to low-effort countries; 
-# the second element to high-effort countries.
-dfs = [{'Country': [], 'Starting Year': [], 'Starting GDP': [], 'GDP Multiplication Divided By Time Passed': []}]
-dfs.append(deepcopy(dfs[0]))
-
-for i, country in enumerate(countries):
-    # Real GDP growth divided by number of years, in base 100. 
-    """print(f'  - {country.name} ({country.starting_year}) - (Starting GDP ${country.history[0]:,.2f}):',
-                f'{100 * (country.history[-1] / country.history[0]) / len(country.history)}')"""
-    
-    df_index = 0
-    if i >= 5:
-        df_index = 1
-    
-    # Add data to a pandas DataFrame.
-    dfs[df_index]['Country'].append(country.name)
-    dfs[df_index]['Starting Year'].append(country.starting_year)
-    dfs[df_index]['Starting GDP'].append(f'${country.history[0]:,.2f}')
-    dfs[df_index]['GDP Multiplication Divided By Time Passed'].append(
-        100 * (country.history[-1] / country.history[0]) / len(country.history)
-    )
-
-dfs[0] = pd.DataFrame(dfs[0])
-dfs[1] = pd.DataFrame(dfs[1])
-
-print('Low-effort countries:', dfs[0], '', 'High-effort countries:', dfs[1], sep='\n')
\ No newline at end of file
+from correlations_search_engine import load_data
+from country_registry import CountryRegistry, default_registry
+from effort import tax_effort
+from sources import read_owid
+
+OWID_PATH = 'datasets/Our_World_In_Data/OWID_Real_GDP_Per_Capita.csv'
+OWID_COLUMN = 'GDP per capita (output, multiple price benchmarks)'
+
+#  Number of tax effort groups countries are split into (by quantiles), from the lowest.
+# With two of them, they are the low-effort and high-effort countries.
+GROUPS = 2
+
+#  Growth of the real GDP per capita of every country in one pass over its records (country
+# ids, years and values, as returned by 'sources.read_owid'): first and last years and GDPs,
+# years passed between them (whatever gaps there are), number of observations, the GDP
+# multiplication divided by the number of observations (in base 100, as in the paper) and
+# the compound annual growth rate. Returns a DataFrame indexed by country id.
+def growth_metrics(ids: np.ndarray, years: np.ndarray, values: np.ndarray,
+                   registry: CountryRegistry = None) -> pd.DataFrame:
+    registry = default_registry() if registry is None else registry
+
+    available = ~np.isnan(values)
+    ids, years, values = ids[available], years[available], values[available]
+
+    # Records grouped by country and sorted by year, so every country is a contiguous run.
+    order = np.lexsort((years, ids))
+    ids, years, values = ids[order], years[order], values[order]
+
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(ids)] - 1
+
+    elapsed_years = years[ends] - years[starts]
+    multiplication = values[ends] / values[starts]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth_rates = np.where(elapsed_years > 0, multiplication ** (1 / elapsed_years) - 1, np.nan)
+
+    return pd.DataFrame({
+        'country': [registry.name(country_id) for country_id in ids[starts].tolist()],
+        'starting_year': years[starts],
+        'ending_year': years[ends],
+        'starting_gdp': values[starts],
+        'ending_gdp': values[ends],
+        'elapsed_years': elapsed_years,
+        'observations': ends - starts + 1,
+        'multiplication_per_year': 100 * multiplication / (ends - starts + 1),
+        'cagr': growth_rates,
+    }, index=pd.Index(ids[starts], name='country_id'))
+
+#  Tax effort of every country in 'datasets/data.csv' (see 'correlations_search_engine.load_data'),
+# indexed by country id.
+def tax_efforts(registry: CountryRegistry = None) -> pd.Series:
+    registry = default_registry() if registry is None else registry
+    data = load_data()
+
+    ids = [registry.resolve(country_name) for country_name in data['country'].tolist()]
+    known = np.array([country_id is not None for country_id in ids], dtype=bool)
+    efforts = tax_effort(data['tax_burden'], data['unemployment'], data['gdp_ppp'])
+
+    index = pd.Index(np.array([country_id for country_id in ids if country_id is not None], dtype=np.int64), name='country_id')
+    return pd.Series(efforts[known], index=index, name='tax_effort')
+
+#  Growth metrics of every country with a tax effort, along with it and its tax effort group
+# (0 for the lowest quantile, up to 'groups' - 1 for the highest).
+def growth_by_effort(metrics: pd.DataFrame, efforts: pd.Series, groups: int = GROUPS) -> pd.DataFrame:
+    table = metrics.join(efforts, how='inner')
+    table['group'] = pd.qcut(table['tax_effort'], groups, labels=False)
+
+    return table
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Compare the real GDP growth of low-effort and high-effort countries.')
+    parser.parse_args()
+
+    print('--- Real GDP Evolution And Average Historical Tax Effort ---')
+
+    metrics = growth_metrics(*read_owid(OWID_PATH, OWID_COLUMN))
+    table = growth_by_effort(metrics, tax_efforts()).sort_values('tax_effort')
+
+    for group in range(GROUPS):
+        rows = table[table['group'] == group]
+        title = ('Low-effort countries:', 'High-effort countries:')[group] if GROUPS == 2 else f'Tax effort group {group + 1}:'
+
+        # Tables with data, from the lowest tax effort.
+        print(title, pd.DataFrame({
+            'Country': rows['country'],
+            'Starting Year': rows['starting_year'],
+            'Starting GDP': [f'${gdp:,.2f}' for gdp in rows['starting_gdp']],
+            'Years Passed': rows['elapsed_years'],
+            'GDP Multiplication Divided By Time Passed': rows['multiplication_per_year'],
+            'CAGR': [f'{rate:.2%}' for rate in rows['cagr']],
+        }).to_string(index=False), '', sep='\n')
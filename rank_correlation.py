@@ -0,0 +1,172 @@
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+
+#  Correlation kernels between a batch of candidate vectors (the rows of a matrix) and
+# a single target vector that never changes, like the Human Development Index when
+# sweeping tax effort exponents. Everything depending only on the target (its ranks,
+# its order, its ties) is computed once and reused for every batch.
+
+#  Order of every row and, for each sorted position, the first and last positions of
+# the group of tied values it belongs to.
+def _tie_groups(matrix: np.ndarray):
+    length = matrix.shape[1]
+
+    order = np.argsort(matrix, axis=1, kind='mergesort')
+    ordered = np.take_along_axis(matrix, order, axis=1)
+
+    positions = np.broadcast_to(np.arange(length), matrix.shape)
+
+    # Tie groups start where the sorted value changes and end right before the next start.
+    starts = np.ones(matrix.shape, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends = np.ones(matrix.shape, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, positions, length - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    return order, first, last
+
+#  Rank every row of a matrix, giving tied values the average of their ranks
+# (the same convention used by pandas' Spearman correlation).
+def rank_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.atleast_2d(matrix)
+    order, first, last = _tie_groups(matrix)
+
+    ranks = np.empty(matrix.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+
+    return ranks
+
+#  Integer ranks (from 0) of every row, where tied values get the lowest rank of
+# their group. Returns them along with the number of tied pairs of every row.
+def _min_ranks(matrix: np.ndarray):
+    order, first, last = _tie_groups(matrix)
+
+    ranks = np.empty(matrix.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, first, axis=1)
+
+    # Every element is tied with the ones after it within its group.
+    tied_pairs = (last - np.arange(matrix.shape[1])).sum(axis=1)
+
+    return ranks, tied_pairs
+
+#  Number of inversions (pairs i < j with values[i] > values[j]) of every row of a matrix
+# of integer ranks from 0 to 'top' - 1. Rows are merge sorted bottom-up, all of them at
+# the same time. At every level, each pair of sorted blocks is merged with a stable sort
+# (so ties keep left elements first), and an element of the right block that ends up
+# at a position 'p' jumped over exactly 'p - j' left elements not bigger than it, 'j'
+# being its position within the right block; the rest of the left block are inversions.
+def count_inversions(ranks: np.ndarray, top: int) -> np.ndarray:
+    rows, length = ranks.shape
+    size = 1 << max(length - 1, 0).bit_length()
+
+    # Padding with the biggest value at the end adds no inversions.
+    merged = np.full((rows, size), top, dtype=np.int64)
+    merged[:, :length] = ranks
+
+    inversions = np.zeros(rows, dtype=np.int64)
+    width = 1
+    while width < size:
+        blocks = merged.reshape(rows, size // (2 * width), 2 * width)
+
+        order = np.argsort(blocks, axis=2, kind='stable')
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(2 * width), axis=2)
+
+        not_bigger = positions[:, :, width:] - np.arange(width)
+        inversions += (width - not_bigger).sum(axis=(1, 2))
+
+        merged = np.take_along_axis(blocks, order, axis=2).reshape(rows, size)
+        width *= 2
+
+    return inversions
+
+# Pearson, Spearman and Kendall (tau-b) correlations of batches of vectors against a fixed target.
+class TargetCorrelation:
+    __slots__ = ('length', 'centered', 'norm', 'centered_ranks', 'ranks_norm',
+                 'min_ranks', 'tied_pairs')
+
+    def __init__(self, target: np.ndarray):
+        target = np.asarray(target, dtype=float)
+        self.length = len(target)
+
+        self.centered = target - target.mean()
+        self.norm = np.linalg.norm(self.centered)
+
+        ranks = rank_rows(target)[0]
+        self.centered_ranks = ranks - ranks.mean()
+        self.ranks_norm = np.linalg.norm(self.centered_ranks)
+
+        min_ranks, tied_pairs = _min_ranks(target[np.newaxis, :])
+        self.min_ranks = min_ranks[0]
+        self.tied_pairs = int(tied_pairs[0])
+
+    def pearson(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.atleast_2d(batch)
+        centered = batch - batch.mean(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (centered @ self.centered) / (np.linalg.norm(centered, axis=1) * self.norm)
+
+    def spearman(self, batch: np.ndarray) -> np.ndarray:
+        ranks = rank_rows(batch)
+        centered = ranks - ranks.mean(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (centered @ self.centered_ranks) / (np.linalg.norm(centered, axis=1) * self.ranks_norm)
+
+    #  Kendall's tau-b in O(n log n) per vector (Knight's algorithm): sort the pairs by the
+    # target and then by the vector, and count the inversions left in the vector.
+    def kendall(self, batch: np.ndarray) -> np.ndarray:
+        ranks, tied_pairs = _min_ranks(np.atleast_2d(batch))
+
+        return _kendall(ranks, tied_pairs, self.min_ranks, self.tied_pairs)
+
+#  Kendall's tau-b from the integer ranks (and tied pairs) of both the vectors and the
+# targets, which can be a single one or one per vector.
+def _kendall(ranks: np.ndarray, tied_pairs: np.ndarray, target_ranks: np.ndarray, 
+             target_tied_pairs: np.ndarray | int) -> np.ndarray:
+    length = ranks.shape[1]
+
+    # Sorting by (target, vector) at once through a single integer key.
+    keys = target_ranks * length + ranks
+    order = np.argsort(keys, axis=1, kind='stable')
+    ordered_keys = np.take_along_axis(keys, order, axis=1)
+
+    # Pairs tied in both the target and the vector.
+    jointly_tied = _min_ranks(ordered_keys)[1]
+
+    inversions = count_inversions(np.take_along_axis(ranks, order, axis=1), length)
+
+    pairs = length * (length - 1) // 2
+    concordance = pairs - target_tied_pairs - tied_pairs + jointly_tied - 2 * inversions
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return concordance / np.sqrt((pairs - target_tied_pairs) * (pairs - tied_pairs).astype(float))
+
+#  Correlations of every row of 'x' against the same row of 'y' (for instance, when every
+# row is a different resample of the data) with each of the given methods ('pearson',
+# 'spearman' and/or 'kendall'). Returns a (rows, methods) array.
+def paired_correlations(x: np.ndarray, y: np.ndarray, methods: Tuple[str] = ('pearson', 'spearman', 'kendall')) -> np.ndarray:
+    x, y = np.atleast_2d(x), np.atleast_2d(y)
+
+    def pearson(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        first = first - first.mean(axis=1, keepdims=True)
+        second = second - second.mean(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (first * second).sum(axis=1) / (np.linalg.norm(first, axis=1) * np.linalg.norm(second, axis=1))
+
+    def kendall(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        return _kendall(*_min_ranks(first), *_min_ranks(second))
+
+    kernels = {
+        'pearson': pearson,
+        'spearman': lambda first, second: pearson(rank_rows(first), rank_rows(second)),
+        'kendall': kendall,
+    }
+
+    return np.column_stack([kernels[method](x, y) for method in methods])
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import numpy as np
+
+#  Fit a polynomial of the given degree to every series (row) of 'y' at once by least
+# squares. 'x' is either shared by every series (1D) or has a row per series, and
+# missing points (NaN in 'x' or 'y') are left out of each series' fit. Returns a
+# (series, degree + 1) array of coefficients in increasing powers of x (intercept
+# first); series with fewer points than coefficients get NaN.
+def polynomial_fit(x: np.ndarray, y: np.ndarray, degree: int = 1) -> np.ndarray:
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+
+    available = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(available, x, 0)
+    y = np.where(available, y, 0)
+
+    #  (series, points, degree + 1) Vandermonde matrices, where missing points are rows of
+    # zeros. Columns are scaled to unit norm and every system is solved through its QR
+    # decomposition (instead of the normal equations) to keep them well conditioned.
+    vandermonde = (x[..., np.newaxis] ** np.arange(degree + 1)) * available[..., np.newaxis]
+    scale = np.linalg.norm(vandermonde, axis=1, keepdims=True)
+    scale[scale == 0] = 1
+    vandermonde = vandermonde / scale
+
+    q, r = np.linalg.qr(vandermonde)
+    projections = np.einsum('spi,sp->si', q, y)
+
+    coefficients = (np.linalg.pinv(r) @ projections[..., np.newaxis])[..., 0] / scale[:, 0]
+    coefficients[available.sum(axis=1) < degree + 1] = np.nan
+
+    return coefficients
+
+#  Evaluate the polynomials returned by 'polynomial_fit' at 'x', which is either shared by
+# every polynomial (1D) or has a row per polynomial. Returns a (polynomials, points) array.
+def polynomial_predict(coefficients: np.ndarray, x: np.ndarray) -> np.ndarray:
+    coefficients = np.atleast_2d(coefficients)
+    x = np.asarray(x, dtype=float)
+
+    # Horner's method, from the highest power down to the intercept.
+    result = np.zeros(np.broadcast_shapes((coefficients.shape[0], 1), np.atleast_2d(x).shape))
+    for power in range(coefficients.shape[1] - 1, -1, -1):
+        result = result * x + coefficients[:, power:power + 1]
+
+    return result
@@ -1,51 +1,244 @@
-# Import sqrt from math library.
-from math import sqrt
+from __future__ import annotations
+from argparse import ArgumentParser
+from math import copysign, inf, nan, prod
+from typing import TYPE_CHECKING, Dict, Iterator, List, Sequence, Tuple
+import json
+
+from effort import PHI, tax_effort
+from tables import write_table
+
+#  NumPy is only loaded for grids and pandas to build tables, so printing scenarios of
+# labelled points needs neither of them.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+#  Scenarios of the tax effort function (omega): either labelled points or Cartesian grids
+# over tax burden, unemployment and GDP PPP per capita. Grids can hold millions of points,
+# so they are evaluated (and written) in chunks of 'CHUNK_SIZE' points with NumPy, while
+# the few labelled points are evaluated one by one with plain numbers.
+
+FIELDS = ('tax_burden', 'unemployment', 'gdp_ppp')
+
+# Points evaluated at once.
+CHUNK_SIZE = 2 ** 18
+
+# Scenarios of the paper, as labelled (tax burden, unemployment, GDP PPP per capita) points.
+SCENARIOS = {
+    ### A, B and C ###
+    '1': {'points': {'A': (0.1, 0.05, 1_250), 'B': (0.1, 0.05, 10_000), 'C': (0.1, 0.05, 50_000)}},
+
+    ### D, E, F, G ###
+    '2': {'points': {'D': (0.5, 0.05, 20_000), 'E': (0.33, 0.05, 20_000), 'F': (0.1, 0.05, 20_000), 'G': (0.01, 0.05, 20_000)}},
+
+    ### H, I, J, K ###
+    '3': {'points': {'H': (0.1, 0.33, 20_000), 'I': (0.1, 0.2, 20_000), 'J': (0.1, 0.1, 20_000), 'K': (0.1, 0.025, 20_000)}},
+}
+
+#  Values of a grid axis from its definition: a number, a list of numbers, a
+# {'start', 'stop', 'num'} dict (evenly spaced values, both ends included) or
+# text, either 'start:stop:num' or comma-separated numbers.
+def parse_axis(definition) -> np.ndarray:
+    import numpy as np
+
+    if isinstance(definition, str):
+        if ':' in definition:
+            start, stop, num = definition.split(':')
+            return np.linspace(float(start), float(stop), int(num))
+
+        return np.array([float(value) for value in definition.split(',')])
+
+    if isinstance(definition, dict):
+        return np.linspace(float(definition['start']), float(definition['stop']), int(definition['num']))
+
+    return np.atleast_1d(np.asarray(definition, dtype=float))
+
+#  A scenario: labelled points (when 'labels' is given, 'values' holds a list with a value
+# of every field per label) or a grid with every combination of the values (arrays) of
+# each field.
+class Scenario:
+    __slots__ = 'name', 'values', 'labels'
+
+    def __init__(self, name: str, values: Dict[str, np.ndarray | List[float]], labels: List[str] = None):
+        self.name = name
+        self.labels = labels
+
+        if labels is None:
+            import numpy as np
+
+            self.values = {field: np.atleast_1d(np.asarray(values[field], dtype=float)) for field in FIELDS}
+        else:
+            self.values = {field: [float(value) for value in values[field]] for field in FIELDS}
+
+        for field, parameter_title in (('tax_burden', 'tax burden'), ('unemployment', 'unemployment')):
+            if not all(0 <= value < 1 for value in (self.values[field].tolist() if self.is_grid else self.values[field])):
+                raise ValueError(f'Invalid {parameter_title} in scenario {name!r}: it must be a (positive) percentage '
+                                 'represented as a number from 0 (included) to 1 (excluded).')
+
+    #  Build a scenario from its definition: {'points': {label: (tax burden, unemployment,
+    # GDP PPP)}} or {'grid': {field: axis}} (see 'parse_axis').
+    @classmethod
+    def from_definition(cls, name: str, definition: Dict) -> Scenario:
+        if 'points' in definition:
+            labels = list(definition['points'])
+            points = [definition['points'][label] for label in labels]
+
+            return cls(name, {field: [point[index] for point in points] for index, field in enumerate(FIELDS)}, labels)
+
+        return cls(name, {field: parse_axis(definition['grid'][field]) for field in FIELDS})
+
+    @property
+    def is_grid(self) -> bool:
+        return self.labels is None
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(self.values[field]) for field in FIELDS) if self.is_grid else (len(self.labels),)
+
+    @property
+    def size(self) -> int:
+        return prod(self.shape)
+
+    #  Tax burden, unemployment and GDP PPP of every point (in the order of the labels or,
+    # in grids, with GDP PPP changing fastest) in chunks of 'chunk_size' points (arrays in
+    # grids, lists otherwise).
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray | List[float]]]:
+        for start in range(0, self.size, chunk_size):
+            stop = min(start + chunk_size, self.size)
+
+            if self.is_grid:
+                import numpy as np
+
+                indices = np.unravel_index(np.arange(start, stop), self.shape)
+                yield {field: self.values[field][index] for field, index in zip(FIELDS, indices)}
+            else:
+                yield {field: self.values[field][start:stop] for field in FIELDS}
+
+# Scenarios defined in a JSON file: {name: definition} (see 'Scenario.from_definition').
+def load_scenarios(path: str) -> List[Scenario]:
+    with open(path, 'r') as file:
+        return [Scenario.from_definition(name, definition) for name, definition in json.load(file).items()]
+
+#  Tax effort of every point of a scenario, in chunks of 'chunk_size' points (see 'Scenario.chunks'):
+# arrays in grids and lists of plain numbers for labelled points.
+def tax_efforts(scenario: Scenario, exponent: float = PHI, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray | List[float]]:
+    for chunk in scenario.chunks(chunk_size):
+        if scenario.is_grid:
+            yield tax_effort(chunk['tax_burden'], chunk['unemployment'], chunk['gdp_ppp'], exponent)
+        else:
+            yield [float(tax_effort(*point, exponent)) for point in zip(*(chunk[field] for field in FIELDS))]
+
+#  Tax effort of every point of a scenario, in chunks (DataFrames with the scenario, the
+# label of every point, if any, its fields and its tax effort). If a baseline point is
+# given, the ratio of every tax effort to the baseline's is included as well.
+def evaluate(scenario: Scenario, exponent: float = PHI, baseline: Sequence[float] = None,
+             chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    import numpy as np
+    import pandas as pd
+
+    baseline_effort = None if baseline is None else float(tax_effort(*baseline, exponent))
+
+    for start, chunk in zip(range(0, scenario.size, chunk_size), scenario.chunks(chunk_size)):
+        efforts = np.asarray(tax_effort(*(np.asarray(chunk[field]) for field in FIELDS), exponent))
+
+        # Labels are text even when there are none (in grids), so every chunk has the same types.
+        frame = pd.DataFrame({
+            'scenario': scenario.name,
+            'label': pd.array([None] * len(efforts) if scenario.is_grid else scenario.labels[start:start + len(efforts)], dtype='string'),
+            **chunk,
+            'tax_effort': efforts,
+        })
+
+        if baseline_effort is not None:
+            frame['ratio'] = efforts / baseline_effort
+
+        yield frame
+
+#  Ratio between the tax efforts of every pair of points of a scenario (the first one's to
+# the second one's, in the order they were defined), as the labels of the first and second
+# points of every pair and their ratios. Grids have too many pairs, so only labelled points
+# are supported. Ratios to a null tax effort are infinite (or NaN, if both are null).
+def pair_ratios(scenario: Scenario, exponent: float = PHI) -> Tuple[List[str], List[str], List[float]]:
+    if scenario.is_grid:
+        raise ValueError(f'Invalid scenario {scenario.name!r}: pairwise ratios are only computed for labelled points.')
+
+    (efforts,) = tax_efforts(scenario, exponent, scenario.size)
+    pairs = [(first, second) for first in range(len(efforts)) for second in range(first + 1, len(efforts))]
+
+    return ([scenario.labels[first] for first, _ in pairs], [scenario.labels[second] for _, second in pairs],
+            [efforts[first] / efforts[second] if efforts[second] else copysign(inf, efforts[first]) if efforts[first] else nan
+             for first, second in pairs])
+
+# Pairwise ratios of a scenario (see 'pair_ratios') as a table.
+def ratios(scenario: Scenario, exponent: float = PHI) -> pd.DataFrame:
+    import pandas as pd
+
+    first, second, values = pair_ratios(scenario, exponent)
+
+    return pd.DataFrame({'scenario': scenario.name, 'first': first, 'second': second, 'ratio': values})
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Evaluate the tax effort function over scenarios of points and grids.')
+    parser.add_argument('scenarios', nargs='*', help=f'scenarios of the paper to evaluate ({", ".join(SCENARIOS)})')
+    parser.add_argument('--file', help='JSON file with scenario definitions')
+    parser.add_argument('--tax-burden', help="grid axis: a number, 'start:stop:num' or comma-separated numbers")
+    parser.add_argument('--unemployment', help='grid axis (see --tax-burden)')
+    parser.add_argument('--gdp-ppp', help='grid axis (see --tax-burden)')
+    parser.add_argument('--exponent', type=float, default=PHI, help='exponent of GDP PPP (the golden number by default)')
+    parser.add_argument('--baseline', help="'tax burden,unemployment,GDP PPP' point every tax effort is compared with")
+    parser.add_argument('--output', help='CSV (or .parquet) file to write every tax effort to')
+    parser.add_argument('--ratios', help='CSV (or .parquet) file to write the pairwise ratios of labelled points to')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    arguments = parser.parse_args()
+
+    for name in arguments.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'invalid scenario: {name!r} (choose from {", ".join(SCENARIOS)})')
+
+    scenarios = [Scenario.from_definition(name, SCENARIOS[name]) for name in arguments.scenarios]
+
+    if arguments.file:
+        scenarios += load_scenarios(arguments.file)
+
+    axes = (arguments.tax_burden, arguments.unemployment, arguments.gdp_ppp)
+    if any(axis is not None for axis in axes):
+        if any(axis is None for axis in axes):
+            parser.error('grids need --tax-burden, --unemployment and --gdp-ppp')
+
+        scenarios.append(Scenario('grid', {field: parse_axis(axis) for field, axis in zip(FIELDS, axes)}))
+
+    if not scenarios:
+        scenarios = [Scenario.from_definition(name, definition) for name, definition in SCENARIOS.items()]
+
+    baseline = None if arguments.baseline is None else [float(value) for value in arguments.baseline.split(',')]
+
+    if arguments.output:
+        write_table((frame for scenario in scenarios
+                     for frame in evaluate(scenario, arguments.exponent, baseline, arguments.chunk_size)), arguments.output)
+
+    if arguments.ratios:
+        if all(scenario.is_grid for scenario in scenarios):
+            parser.error('pairwise ratios need scenarios of labelled points')
+
+        write_table((ratios(scenario, arguments.exponent) for scenario in scenarios if not scenario.is_grid), arguments.ratios)
+
+    # Without output files, results are printed.
+    if not arguments.output and not arguments.ratios:
+        for scenario in scenarios:
+            print(f'### {scenario.name} ###')
 
-# Use it to hold the golden number.
-PHI = (1 + sqrt(5)) / 2 
+            if scenario.is_grid:
+                extremes = [(efforts.min(), efforts.max())
+                            for efforts in tax_efforts(scenario, arguments.exponent, arguments.chunk_size)]
+                print(f'{scenario.size:,} points: tax efforts from {min(low for low, _ in extremes)}',
+                      f'to {max(high for _, high in extremes)}')
+                continue
 
-# Ask the user what scenario he/she would like to see.
-scenario = int(input('Type what scenario you would like to analyse (1, 2 or 3): '))
-
-# Ensure the chosen scenario is one of the available.
-assert scenario in {1, 2, 3}, 'Given option is not one of the available'
-
-# Define tax effort function (omega).
-te = lambda tax_burden, unemployment, gdp_ppp: tax_burden / ((1 - tax_burden) * (1 - unemployment) * (gdp_ppp ** PHI))
-
-
-### A, B and C ###
-if scenario == 1:
-    C1 = te(0.1, 0.05, 1_250)
-    C2 = te(0.1, 0.05, 10_000)
-    C3 = te(0.1, 0.05, 50_000)
-
-    print('Tax Efforts:', f'  - A: {C1}', f'  - B: {C2}', f'  - C: {C3}', sep='\n')
-
-    print('Relations:', f'  - A to B: {C1 / C2}', f'  - A to C: {C1 / C3}', f'  - B to C: {C2 / C3}', sep='\n')
-
-
-### D, E, F, G ###
-if scenario == 2:
-    C1 = te(0.5, 0.05, 20_000)
-    C2 = te(0.33, 0.05, 20_000)
-    C3 = te(0.1, 0.05, 20_000)
-    C4 = te(0.01, 0.05, 20_000)
-
-    print('Tax Efforts:', f'  - D: {C1}', f'  - E: {C2}', f'  - F: {C3}', f'  - G: {C4}', sep='\n')
-
-    print('Relations:', f'  - D to E: {C1 / C2}', f'  - D to F: {C1 / C3}', f'  - D to G: {C1 / C4}',
-                f'  - E to F: {C2 / C3}', f'  - E to G: {C2 / C4}', f'  - F to G: {C3 / C4}', sep='\n')
-
-
-### H, I, J, K ###
-if scenario == 3:
-    C1 = te(0.1, 0.33, 20_000)
-    C2 = te(0.1, 0.2, 20_000)
-    C3 = te(0.1, 0.1, 20_000)
-    C4 = te(0.1, 0.025, 20_000)
-
-    print('Tax Efforts:', f'  - H: {C1}', f'  - I: {C2}', f'  - J: {C3}', f'  - K: {C4}', sep='\n')
-
-    print('Relations:', f'  - H to I: {C1 / C2}', f'  - H to J: {C1 / C3}', f'  - H to K: {C1 / C4}',
-                f'  - I to J: {C2 / C3}', f'  - I to K: {C2 / C4}', f'  - J to K: {C3 / C4}', sep='\n')
\ No newline at end of file
+            (efforts,) = tax_efforts(scenario, arguments.exponent, scenario.size)
+            print('Tax Efforts:', *(f'  - {label}: {effort}' for label, effort in zip(scenario.labels, efforts)),
+                  sep='\n')
+
+            print('Relations:', *(f'  - {first} to {second}: {ratio}'
+                                  for first, second, ratio in zip(*pair_ratios(scenario, arguments.exponent))),
+                  sep='\n')
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from csv import reader
+from functools import partial
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from country_registry import CountryRegistry, default_registry
+
+#  Version of the parsers below. It must be increased whenever their output changes,
+# so previously cached datasets are no longer used.
+PARSER_VERSION = 3
+
+#  Every record read from a source: (country id, year, value). Countries are identified
+# by their id in the country registry, whatever spelling the source uses, and rows of
+# unknown entities (regions, income groups, etc.) are skipped.
+Record = Tuple[int, int, float]
+
+# The same records as three arrays: country ids, years and values.
+Columns = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+#  Rows of OurWorldInData CSV files read at once by 'read_owid_columns'. Memory in use
+# depends on it rather than on the size of the file.
+OWID_CHUNK_SIZE = 65_536
+
+#  Stream the given value columns of an OurWorldInData CSV file in chunks of up to
+# 'chunk_size' rows. Only the entity, the year and those columns are kept from every
+# row, and rows of unknown entities (or of countries not in 'countries', a collection
+# of ids, if given) are dropped during the scan. Every chunk is a dict of arrays: 
+# 'country' (ids), 'year' and one per column (missing values are NaN), converted 
+# column by column instead of value by value.
+def read_owid_columns(path: str, columns: Sequence[str], countries: Collection[int] = None,
+                      registry: CountryRegistry = None, chunk_size: int = OWID_CHUNK_SIZE) -> Iterator[Dict[str, np.ndarray]]:
+    registry = default_registry() if registry is None else registry
+    countries = None if countries is None else set(countries)
+
+    with open(path, 'r', newline='') as file:
+        rows = reader(file)
+
+        header = next(rows, [])
+        entity_column, year_column = header.index('Entity'), header.index('Year')
+        value_columns = [header.index(column) for column in columns]
+
+        # Entities are repeated in every row of theirs, so each one is only resolved once.
+        entity_ids = {}
+
+        def chunk(country_ids: List[int], years: List[str], values: List[List[str]]) -> Dict[str, np.ndarray]:
+            return {
+                'country': np.array(country_ids, dtype=np.int64),
+                'year': np.array(years).astype(np.int64),
+                **{column: _to_float(column_values) for column, column_values in zip(columns, values)},
+            }
+
+        country_ids, years, values = [], [], [[] for _ in columns]
+        for row in rows:
+            entity = row[entity_column]
+
+            try:
+                country_id = entity_ids[entity]
+            except KeyError:
+                country_id = entity_ids[entity] = registry.resolve(entity)
+
+            if country_id is None or (countries is not None and country_id not in countries):
+                continue
+
+            country_ids.append(country_id)
+            years.append(row[year_column])
+            for column_values, column in zip(values, value_columns):
+                column_values.append(row[column])
+
+            if len(country_ids) == chunk_size:
+                yield chunk(country_ids, years, values)
+                country_ids, years, values = [], [], [[] for _ in columns]
+
+        if country_ids:
+            yield chunk(country_ids, years, values)
+
+# Float array from the text of a CSV column, where empty values are NaN.
+def _to_float(values: List[str]) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        return np.array([value or 'nan' for value in values], dtype=float)
+
+# Read one value column of an OurWorldInData CSV file (see 'read_owid_columns').
+def read_owid(path: str, column: str, divisor: int | float = 1, registry: CountryRegistry = None,
+              countries: Collection[int] = None) -> Columns:
+    chunks = list(read_owid_columns(path, (column,), countries, registry))
+
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    return (
+        np.concatenate([chunk['country'] for chunk in chunks]),
+        np.concatenate([chunk['year'] for chunk in chunks]),
+        np.concatenate([chunk[column] for chunk in chunks]) / divisor,
+    )
+
+#  Read a workbook with a row per country and a column per year (like the ones from
+# the World Bank and the International Monetary Fund), starting from 'first_column'
+# and, if given, up to 'last_year' (included). Rows are streamed from a read-only
+# workbook and the years in the header are parsed once, so records are produced
+# lazily as the file is read.
+def read_worksheet(path: str, first_column: int, divisor: int | float = 1, 
+                   registry: CountryRegistry = None, last_year: int = None) -> Iterator[Record]:
+    from openpyxl import load_workbook
+
+    registry = default_registry() if registry is None else registry
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+
+        # Year of every column holding one, from the header.
+        header = next(rows, ())
+        year_columns = []
+        for column, title in enumerate(header[first_column - 1:], start=first_column - 1):
+            try:
+                year = int(title)
+            except (TypeError, ValueError):
+                continue
+
+            if last_year is None or year <= last_year:
+                year_columns.append((column, year))
+
+        for row in rows:
+            country_name = row[0] if row else None
+
+            if not isinstance(country_name, str):
+                continue
+
+            country_id = registry.resolve(country_name)
+
+            if country_id is None:
+                continue
+
+            for column, year in year_columns:
+                if column >= len(row):
+                    break
+
+                try:
+                    yield country_id, year, float(row[column]) / divisor
+                except (TypeError, ValueError):
+                    continue
+    finally:
+        wb.close()
+
+# Gather records into columns.
+def to_columns(records: Iterable[Record]) -> Columns:
+    records = list(records)
+
+    return (
+        np.array([record[0] for record in records], dtype=np.int64),
+        np.array([record[1] for record in records], dtype=np.int64),
+        np.array([record[2] for record in records], dtype=float),
+    )
+
+# Read a workbook (see 'read_worksheet') into columns.
+def read_worksheet_columns(path: str, first_column: int, divisor: int | float = 1,
+                           registry: CountryRegistry = None, last_year: int = None) -> Columns:
+    return to_columns(read_worksheet(path, first_column, divisor, registry, last_year))
+
+#  Last year of actual values in the International Monetary Fund workbooks. Their later
+# columns (up to 2027) hold the IMF's forecasts, which are left out so projections never
+# enter the panel as if they had been observed (nor count as changes when revised).
+IMF_LAST_ACTUAL_YEAR = 2021
+
+#  Where every indicator comes from: reader, path and the reader's arguments. Percentages
+# are divided by 100 so they are represented as numbers from 0 to 1.
+SOURCES: Dict[str, Tuple[Callable[..., Columns], str, str | int, int]] = {
+    'tax_burden': (read_owid, 'datasets/Our_World_In_Data/OWID_Total_Tax_Revenues_GDP.csv',
+                   'Total tax revenue (% of GDP) (ICTD (2021))', 100),
+    'unemployment': (read_worksheet_columns, 'datasets/World_Bank/WB_Unemployment.xlsx', 5, 100),
+    'gdp_ppp': (partial(read_worksheet_columns, last_year=IMF_LAST_ACTUAL_YEAR),
+                'datasets/International_Monetary_Fund/IMF_GDP_Per_Capita_PPP.xlsx', 2, 1),
+    'real_gdp': (read_owid, 'datasets/Our_World_In_Data/OWID_GDP_Per_Capita_In_US_Dollar_World_Bank.csv',
+                 'GDP per capita (constant 2015 US$)', 1),
+    'hdi': (read_owid, 'datasets/Our_World_In_Data/OWID_Human_Development_Index.csv', 'Human Development Index', 1),
+    'hours': (read_owid, 'datasets/Our_World_In_Data/OWID_Annual_Working_Hours_Per_Worker.csv',
+              'Average annual working hours per worker', 1),
+}
+
+# Read every record of an indicator from its source.
+def read_source(indicator: str) -> Columns:
+    reader, path, argument, divisor = SOURCES[indicator]
+
+    return reader(path, argument, divisor)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+from csv import writer
+from string import ascii_uppercase
+from typing import Dict
+import os
+
+import numpy as np
+from openpyxl import Workbook
+
+#  Synthetic versions of the datasets in 'datasets/', with the same layout as the
+# real ones but any number of countries and years. They are used to benchmark every
+# stage of the analysis at scales bigger than the real sources.
+
+# Files written by 'generate', relative to the directory given.
+FILES = {
+    'registry': 'countries.csv',
+    'data': 'data.csv',
+    'tax_burden': 'OWID_Total_Tax_Revenues_GDP.csv',
+    'real_gdp': 'OWID_GDP_Per_Capita_In_US_Dollar_World_Bank.csv',
+    'hdi': 'OWID_Human_Development_Index.csv',
+    'hours': 'OWID_Annual_Working_Hours_Per_Worker.csv',
+    'unemployment': 'WB_Unemployment.xlsx',
+    'gdp_ppp': 'IMF_GDP_Per_Capita_PPP.xlsx',
+}
+
+# Value column of every OurWorldInData file (the same ones read by 'sources.SOURCES').
+OWID_COLUMNS = {
+    'tax_burden': 'Total tax revenue (% of GDP) (ICTD (2021))',
+    'real_gdp': 'GDP per capita (constant 2015 US$)',
+    'hdi': 'Human Development Index',
+    'hours': 'Average annual working hours per worker',
+}
+
+#  Three-letter code of the country with the given index (AAA, AAB, ...). There are
+# 26 ** 3 = 17,576 of them.
+def country_code(index: int) -> str:
+    return ''.join(ascii_uppercase[index // 26 ** power % 26] for power in (2, 1, 0))
+
+#  Random (countries, years) series of every indicator. GDPs grow at a random pace
+# from a random starting point and the rest of indicators wander around a random
+# level. About 'missing' of every indicator's values are NaN.
+def generate_values(countries: int, years: int, missing: float = 0.1, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+
+    def wander(low: float, high: float, step: float) -> np.ndarray:
+        level = rng.uniform(low, high, (countries, 1))
+        noise = np.cumsum(rng.normal(0, step, (countries, years)), axis=1)
+
+        return np.clip(level + noise, low, high)
+
+    growth = rng.normal(0.02, 0.015, (countries, 1)) + rng.normal(0, 0.03, (countries, years))
+    gdp_ppp = rng.uniform(700, 60_000, (countries, 1)) * np.exp(np.cumsum(growth, axis=1))
+
+    values = {
+        'tax_burden': wander(2, 50, 0.5),
+        'unemployment': wander(0.5, 30, 0.3),
+        'gdp_ppp': gdp_ppp,
+        'real_gdp': gdp_ppp * rng.uniform(0.4, 0.9, (countries, 1)),
+        'hdi': wander(0.3, 0.98, 0.005),
+        'hours': wander(1_300, 2_600, 10),
+    }
+
+    for indicator in values:
+        values[indicator][rng.random((countries, years)) < missing] = np.nan
+
+    return values
+
+def _write_owid(path: str, names, codes, first_year: int, column: str, values: np.ndarray) -> None:
+    with open(path, 'w', newline='') as file:
+        table = writer(file)
+        table.writerow(('Entity', 'Code', 'Year', column))
+
+        for name, code, row in zip(names, codes, values.tolist()):
+            table.writerows((name, code, first_year + offset, value) for offset, value in enumerate(row) if value == value)
+
+#  Write a directory with synthetic datasets of the given scale: every OurWorldInData CSV,
+# the World Bank and IMF workbooks, 'data.csv' (with the last complete year of every
+# country) and the country registry needed to read them. Returns the path of every file.
+def generate(directory: str, countries: int = 200, years: int = 60, first_year: int = 1960,
+             missing: float = 0.1, seed: int = 0) -> Dict[str, str]:
+    if countries > 26 ** 3:
+        raise ValueError(f'Invalid number of countries: it must be at most {26 ** 3}.')
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, file_name) for name, file_name in FILES.items()}
+
+    names = [f'Country {index}' for index in range(countries)]
+    codes = [country_code(index) for index in range(countries)]
+    values = generate_values(countries, years, missing, seed)
+
+    with open(paths['registry'], 'w', newline='') as file:
+        table = writer(file)
+        table.writerow(('code', 'name', 'aliases'))
+        table.writerows((code, name, '') for code, name in zip(codes, names))
+
+    for indicator, column in OWID_COLUMNS.items():
+        _write_owid(paths[indicator], names, codes, first_year, column, values[indicator])
+
+    # World Bank layout: four columns describing the row and then one per year (as text).
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code',
+               *(str(first_year + offset) for offset in range(years))])
+    for name, code, row in zip(names, codes, values['unemployment'].tolist()):
+        ws.append([name, code, 'Unemployment, total (% of total labor force)', 'SL.UEM.TOTL.ZS',
+                   *(value if value == value else None for value in row)])
+    wb.save(paths['unemployment'])
+
+    # IMF layout: a title followed by the years, an empty row and one row per country.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['GDP per capita, current prices (Purchasing power parity; international dollars per capita)',
+               *(first_year + offset for offset in range(years))])
+    ws.append([None] * (years + 1))
+    for name, row in zip(names, values['gdp_ppp'].tolist()):
+        ws.append([name, *(value if value == value else 'no data' for value in row)])
+    wb.save(paths['gdp_ppp'])
+
+    # Preprocessed data, as in 'datasets/data.csv', from the last year with every value.
+    complete = np.logical_and.reduce([~np.isnan(values[indicator]) for indicator in ('tax_burden', 'unemployment', 'gdp_ppp', 'hdi')])
+    last_complete = years - 1 - np.argmax(complete[:, ::-1], axis=1)
+
+    with open(paths['data'], 'w', newline='') as file:
+        table = writer(file)
+        table.writerow(('country', 'gdp_per_capita_ppp', 'tax_burden', 'hdi', 'unemployment'))
+
+        for index, offset in enumerate(last_complete.tolist()):
+            if complete[index, offset]:
+                table.writerow((names[index], *(values[indicator][index, offset]
+                                                for indicator in ('gdp_ppp', 'tax_burden', 'hdi', 'unemployment'))))
+
+    return paths
@@ -0,0 +1,37 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+#  Write chunks of a table to a CSV file or, if the path ends with '.parquet', to a Parquet
+# file. Chunks are written as they come, so memory stays bounded. Both are written through
+# 'pyarrow', which Parquet files need; without it, CSV files are written (many times more
+# slowly) by pandas.
+def write_table(frames: Iterator[pd.DataFrame], path: str) -> None:
+    try:
+        import pyarrow as pa
+        from pyarrow import csv, parquet
+    except ImportError:
+        if path.endswith('.parquet'):
+            raise
+
+        with open(path, 'w', newline='') as file:
+            for index, frame in enumerate(frames):
+                frame.to_csv(file, header=index == 0, index=False)
+
+        return
+
+    writer, schema = None, None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+
+            if writer is None:
+                schema = table.schema
+                writer = parquet.ParquetWriter(path, schema) if path.endswith('.parquet') else csv.CSVWriter(path, schema)
+
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
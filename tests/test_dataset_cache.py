@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pytest
+
+from dataset_cache import cache_path, load_arrays, save_arrays
+
+def test_missing_entry(tmp_path):
+    assert load_arrays('missing', str(tmp_path)) is None
+
+def test_saved_entry(tmp_path):
+    save_arrays('key', {'values': np.arange(10.0)}, str(tmp_path))
+
+    np.testing.assert_array_equal(load_arrays('key', str(tmp_path))['values'], np.arange(10.0))
+
+#  Damaged entries (cut to a fraction of their size) count as misses and are removed, so
+# they are built again.
+@pytest.mark.parametrize('kept', [0, 0.01, 0.5])
+def test_damaged_entry(tmp_path, kept):
+    save_arrays('key', {'values': np.arange(10_000.0)}, str(tmp_path))
+    path = cache_path('key', str(tmp_path))
+
+    with open(path, 'rb') as file:
+        content = file.read()
+    with open(path, 'wb') as file:
+        file.write(content[:int(kept * len(content))])
+
+    assert load_arrays('key', str(tmp_path)) is None
+    assert not os.path.exists(path)
+
+    save_arrays('key', {'values': np.arange(10_000.0)}, str(tmp_path))
+    assert load_arrays('key', str(tmp_path)) is not None
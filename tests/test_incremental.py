@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+
+from incremental import INDICATORS, DerivedState
+from panel import Panel
+from synthetic_data import country_code, generate_values
+
+#  Refreshing a kept state with a changed panel must give the same results as computing
+# everything from scratch with that panel.
+
+@pytest.fixture(scope='module')
+def panel():
+    # Synthetic tax burdens and unemployment rates are percentages, the panel keeps fractions.
+    values = generate_values(40, 30, missing=0.1, seed=1)
+    values['tax_burden'] /= 100
+    values['unemployment'] /= 100
+
+    return Panel([f'Country {country_code(index)}' for index in range(40)], 1990,
+                 {indicator: values[indicator] for indicator in INDICATORS})
+
+#  The richest countries are the exemplary ones, so most of the others have real GDPs
+# they went through (and thus results with weights).
+@pytest.fixture(scope='module')
+def exemplary_sets(panel):
+    richest = [panel.countries[row] for row in np.argsort(-np.nanmax(panel['real_gdp'], axis=1)).tolist()]
+
+    return [tuple(richest[:3]), tuple(richest[3:5])]
+
+def _changed(panel, indicator, country_name, column, factor):
+    indicators = {name: values.copy() for name, values in panel.indicators.items()}
+    indicators[indicator][panel.code(country_name), column] *= factor
+
+    return Panel(panel.countries, panel.first_year, indicators, panel.country_ids)
+
+def _scenarios(panel, exemplary_sets):
+    countries = panel.countries
+    example_country = next(country_name for country_name in countries if country_name not in exemplary_sets[0])
+    yield 'gdp_ppp', _changed(panel, 'gdp_ppp', example_country, -5, 1.01)
+    yield 'real_gdp', _changed(panel, 'real_gdp', exemplary_sets[0][0], -5, 1.01)
+    yield 'lost years', Panel(countries, panel.first_year + 5, {name: values[:, 5:] for name, values in panel.indicators.items()},
+                              panel.country_ids)
+    yield 'new year', Panel(countries, panel.first_year, {name: np.concatenate((values, values[:, -1:] * 1.02), axis=1)
+                                                          for name, values in panel.indicators.items()}, panel.country_ids)
+    yield 'removed', panel.select([country_name for country_name in countries if country_name != example_country])
+    yield 'new ids', Panel(countries, panel.first_year, panel.indicators, panel.country_ids + 7)
+
+def _assert_same(state, full):
+    assert list(state.results) == list(full.results)
+    assert state.matches == full.matches
+
+    for pair, expected in full.results.items():
+        result = state.results[pair]
+        assert (result is None) == (expected is None), pair
+        if expected is None:
+            continue
+
+        for field in ('estimation', 'actual_real_gdp_per_capita', 'tax_burden_relation'):
+            assert math.isclose(result[field], expected[field], rel_tol=1e-9, abs_tol=1e-9), (pair, field)
+        assert result['years'] == expected['years']
+        assert all(math.isclose(result['weights'][country_name], weight, rel_tol=1e-9)
+                   for country_name, weight in expected['weights'].items())
+
+    np.testing.assert_array_equal(state.tax_efforts, full.tax_efforts)
+    np.testing.assert_allclose(state.summaries, full.summaries, rtol=1e-9)
+
+@pytest.mark.parametrize('scenario', ['gdp_ppp', 'real_gdp', 'lost years', 'new year', 'removed', 'new ids'])
+def test_refresh_matches_full_build(panel, exemplary_sets, scenario, tmp_path):
+    state = DerivedState.empty(exemplary_sets)
+    state.refresh(panel)
+    assert sum(result is not None for result in state.results.values()) >= 10
+
+    # The state goes through its file, as between two runs.
+    state.save(str(tmp_path / 'state.npz'))
+    state = DerivedState.load(str(tmp_path / 'state.npz'))
+
+    new = dict(_scenarios(panel, exemplary_sets))[scenario]
+    changes = state.refresh(new)
+
+    full = DerivedState.empty(exemplary_sets)
+    full.refresh(new)
+
+    _assert_same(state, full)
+    assert changes['results'] <= len(full.results)
+
+#  The same panel, also once the registry has been rebuilt (countries keep their names,
+# not their ids), changes nothing.
+@pytest.mark.parametrize('shift', [0, 7])
+def test_unchanged_panel_computes_nothing(panel, exemplary_sets, shift):
+    state = DerivedState.empty(exemplary_sets)
+    state.refresh(panel)
+
+    assert state.refresh(Panel(panel.countries, panel.first_year, panel.indicators, panel.country_ids + shift)) == {'cells': dict.fromkeys(INDICATORS, 0), 'countries': [], 'removed': [], 'results': 0}
+
+def test_exemplary_countries_without_data(panel):
+    state = DerivedState.empty([('Atlantis',)])
+
+    with pytest.raises(ValueError):
+        state.refresh(panel)
@@ -0,0 +1,61 @@
+import pytest
+
+import instrumentation
+from instrumentation import span
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+def _peaks():
+    return {record['name']: record['peak_memory'] for record in instrumentation.records}
+
+SIZE = 50 * 1024 ** 2
+
+# A temporary allocated by a span counts towards its peak, whether or not it has nested spans.
+def test_peak_without_nested_spans(enabled):
+    with span('parent'):
+        temporary = bytearray(SIZE)
+        del temporary
+
+    assert _peaks()['parent'] >= SIZE
+
+def test_peak_before_nested_span(enabled):
+    with span('parent'):
+        temporary = bytearray(SIZE)
+        del temporary
+
+        with span('child'):
+            pass
+
+    assert _peaks()['parent'] >= SIZE
+
+def test_peak_between_nested_spans(enabled):
+    with span('parent'):
+        with span('first child'):
+            pass
+
+        temporary = bytearray(SIZE)
+        del temporary
+
+        with span('second child'):
+            pass
+
+    assert _peaks()['parent'] >= SIZE
+
+def test_peak_of_nested_span_is_carried_over(enabled):
+    with span('parent'):
+        temporary = bytearray(SIZE)
+        del temporary
+
+        with span('child'):
+            temporary = bytearray(2 * SIZE)
+            del temporary
+
+    peaks = _peaks()
+    assert peaks['child'] >= 2 * SIZE
+    assert peaks['parent'] >= 2 * SIZE
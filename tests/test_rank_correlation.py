@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from rank_correlation import TargetCorrelation, paired_correlations
+
+stats = pytest.importorskip('scipy.stats')
+
+REFERENCES = {'spearman': stats.spearmanr, 'kendall': stats.kendalltau}
+
+#  Vectors with and without ties (rounded values tie often), compared with SciPy's
+# Spearman correlation and Kendall's tau-b.
+@pytest.fixture(params=[None, 1], ids=['distinct', 'ties'])
+def batch(request):
+    rng = np.random.default_rng(0)
+    target, vectors = rng.normal(size=60), rng.normal(size=(25, 60))
+
+    if request.param is not None:
+        target, vectors = target.round(request.param), vectors.round(request.param)
+
+    return target, vectors
+
+@pytest.mark.parametrize('method', ['spearman', 'kendall'])
+def test_target_correlation(batch, method):
+    target, vectors = batch
+    expected = [REFERENCES[method](vector, target)[0] for vector in vectors]
+
+    np.testing.assert_allclose(getattr(TargetCorrelation(target), method)(vectors), expected, rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize('method', ['spearman', 'kendall'])
+def test_paired_correlations(batch, method):
+    target, vectors = batch
+    others = np.roll(vectors, 1, axis=0) + 0.5 * vectors
+    expected = [REFERENCES[method](first, second)[0] for first, second in zip(vectors, others)]
+
+    np.testing.assert_allclose(paired_correlations(vectors, others, (method,))[:, 0], expected, rtol=1e-12, atol=1e-12)
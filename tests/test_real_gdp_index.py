@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from double_regression import CountryHistory, RealGDPIndex
+
+Point = namedtuple('Point', 'country_name year real_gdp_per_capita position')
+
+#  Positions of the common minimum and maximum of two countries as 'get_common_min' and
+# 'get_common_max' computed them before 'RealGDPIndex', with 'min' and 'max' over every
+# point: (minimum of the first country, minimum of the second one, maximum of the first
+# one, maximum of the second one).
+def _reference(history1, history2):
+    series1, series2 = ([Point(history.country_name, year, value, position) for position, (year, value)
+                         in enumerate(zip(history.years.tolist(), history.real_gdp_per_capita.tolist()))]
+                        for history in (history1, history2))
+
+    initially_upper = series1 if series1[0].real_gdp_per_capita > series2[0].real_gdp_per_capita else series2
+    initially_lower = series1 if series1[0].real_gdp_per_capita <= series2[0].real_gdp_per_capita else series2
+
+    a_min = min(initially_upper, key=lambda point: (point.real_gdp_per_capita, point.year))
+    b_min = min(initially_lower, key=lambda point: (abs(point.real_gdp_per_capita - a_min.real_gdp_per_capita), point.year))
+    common_min = {a_min.country_name: a_min, b_min.country_name: b_min}
+
+    finally_upper = series1 if series1[-1].real_gdp_per_capita > series2[-1].real_gdp_per_capita else series2
+    finally_lower = series1 if series1[-1].real_gdp_per_capita <= series2[-1].real_gdp_per_capita else series2
+
+    a_max = max(finally_lower, key=lambda point: (point.real_gdp_per_capita, point.year))
+    b_max = min(finally_upper, key=lambda point: (abs(point.real_gdp_per_capita - a_max.real_gdp_per_capita), point.year))
+    common_max = {a_max.country_name: a_max, b_max.country_name: b_max}
+
+    return (common_min[history1.country_name].position, common_min[history2.country_name].position,
+            common_max[history1.country_name].position, common_max[history2.country_name].position)
+
+#  Random histories with gaps between years and values rounded to a few levels, so ties
+# (within a country and across countries) are common.
+def _histories(rng, countries, levels):
+    histories = []
+    for code in range(countries):
+        years = np.sort(rng.choice(np.arange(1950, 2023), rng.integers(1, 30), replace=False))
+        values = rng.integers(1, levels + 1, len(years)) * 1000.0
+        ones = np.ones(len(years))
+
+        histories.append(CountryHistory(f'Country {code}', years, ones / 10, ones / 20, ones, values))
+
+    return histories
+
+@pytest.mark.parametrize('levels', [3, 10, 1000])
+def test_common_positions_match_min_max(levels):
+    rng = np.random.default_rng(levels)
+    histories = _histories(rng, 40, levels)
+    index = RealGDPIndex(histories)
+
+    # Pairs of random countries, and every country with itself.
+    codes1, codes2 = rng.integers(0, len(histories), (2, 3000))
+    codes2[:40] = codes1[:40]
+
+    found = np.column_stack(index.common_positions(codes1, codes2))
+    expected = [_reference(histories[code1], histories[code2]) for code1, code2 in zip(codes1.tolist(), codes2.tolist())]
+
+    np.testing.assert_array_equal(found, expected)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from regression import polynomial_fit, polynomial_predict
+
+#  Rows over the years' indexes used by 'historical_tax_effort' (1 to 73) with missing points,
+# as the panels have, fitted at once and compared with NumPy's fit of every row without its
+# missing points.
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(1, 74, dtype=float)
+    y = rng.normal(size=(30, len(x))).cumsum(axis=1) + 100
+    y[rng.random(y.shape) < 0.3] = np.nan
+
+    return x, y
+
+@pytest.mark.parametrize('degree', [1, 2, 3])
+def test_polynomial_fit_matches_polyfit(series, degree):
+    x, y = series
+    coefficients = polynomial_fit(x, y, degree)
+
+    for row, values in zip(coefficients, y):
+        available = ~np.isnan(values)
+        np.testing.assert_allclose(row, np.polyfit(x[available], values[available], degree)[::-1], rtol=1e-6, atol=1e-9)
+
+# Years passed since every series' first point, as 'double_regression.load_data' fits them.
+def test_polynomial_fit_per_series_x(series):
+    x, y = series
+    x = x[np.newaxis, :] - x[np.argmax(~np.isnan(y), axis=1)][:, np.newaxis]
+    coefficients = polynomial_fit(x, y, 1)
+
+    for row, row_x, values in zip(coefficients, x, y):
+        available = ~np.isnan(values)
+        np.testing.assert_allclose(row, np.polyfit(row_x[available], values[available], 1)[::-1], rtol=1e-9, atol=1e-9)
+
+def test_polynomial_fit_too_few_points():
+    y = np.array([[1.0, np.nan, np.nan, 2.0], [np.nan, np.nan, 3.0, np.nan]])
+
+    coefficients = polynomial_fit(np.arange(4), y, 1)
+
+    np.testing.assert_allclose(coefficients[0], [1, 1 / 3])
+    assert np.isnan(coefficients[1]).all()
+
+@pytest.mark.parametrize('degree', [1, 3])
+def test_polynomial_predict_matches_polyval(series, degree):
+    x, y = series
+    coefficients = polynomial_fit(x, y, degree)
+
+    expected = [np.polyval(row[::-1], x) for row in coefficients]
+    np.testing.assert_allclose(polynomial_predict(coefficients, x), expected, rtol=1e-12)